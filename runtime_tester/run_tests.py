@@ -12,6 +12,7 @@ from runtime_tester.Testrecord import Testrecord
 from src import gurobi
 from src.MTM_EXTENDED_iterative import MTM_EXTENDED_iterative
 from src.MMKAI_recursive import MMKAI_recursive
+from src.MMKAI_iterative import MMKAI_iterative
 from src.models.knapsack import Knapsack
 from src.models.item_class import ItemClass
 
@@ -290,6 +291,51 @@ def run_against_gurobi(number_of_knapsacks, number_of_items, number_of_weightcla
     print(f"Gurobi won {gurobi_wins} times")
 
 
+def run_recursive_against_iterative(number_of_knapsacks, number_of_items, number_of_weightclasses,
+                                    min_weight=1, max_weight=10_000, min_capacity=1, max_capacity=100_000,
+                                    knapsacks_per_item_min=1, knapsacks_per_item_max: int | None = None, x=5,
+                                    timeout=60 * 5):
+    """
+    Compares the runtime of MMKAI_recursive and MMKAI_iterative on the same instances. The recursive version may fail
+    with a RecursionError on instances with many item classes and knapsacks, this is reported like a timeout
+    """
+    if knapsacks_per_item_max is None:
+        knapsacks_per_item_max = number_of_knapsacks
+    print(f"Number of knapsacks: {number_of_knapsacks}\nNumber of items: {number_of_items:_}\n"
+          f"Number of weight classes: {number_of_weightclasses}")
+    recursive_times = []
+    iterative_times = []
+    for i in range(x):
+        seed = random.randrange(sys.maxsize)
+        print(f"Seed: {seed}")
+        results = []
+        for algorithm, times in ((MMKAI_recursive, recursive_times), (MMKAI_iterative, iterative_times)):
+            result_value = multiprocessing.Value("d", -1)
+            p = multiprocessing.Process(target=timeit_wrapper, args=(
+                algorithm, False, result_value, number_of_knapsacks, number_of_items, number_of_weightclasses,
+                min_weight, max_weight, min_capacity, max_capacity, knapsacks_per_item_min,
+                knapsacks_per_item_max, seed))
+            p.start()
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+                p.join()
+                result_value.value = -1
+            if result_value.value == -1:
+                print("Timeout")
+            print(f"Required time to solve {algorithm.__name__}: {result_value.value}")
+            results.append(result_value.value)
+            if result_value.value != -1:
+                times.append(result_value.value)
+
+        if -1 not in results:
+            print(f"Speedup of MMKAI_iterative: {results[0] / results[1] if results[1] else 1}")
+
+    if recursive_times and iterative_times:
+        print(f"Mean time MMKAI_recursive: {sum(recursive_times) / len(recursive_times)}")
+        print(f"Mean time MMKAI_iterative: {sum(iterative_times) / len(iterative_times)}")
+
+
 if __name__ == '__main__':
     perform_multiple_tests_json(10)
     with open("./gurobi_run_output.txt", 'w') as sys.stdout:
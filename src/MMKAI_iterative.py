@@ -0,0 +1,77 @@
+# Copyright (c) 2023 Tom Mucke
+"""
+Iterative version of MMKAI_recursive. The branches are kept on an explicit stack, this avoids the recursion limit
+for instances with many item classes and knapsacks and visits the nodes in the same order as MMKAI_recursive
+"""
+from src.MMKAI_recursive import MMKAI_recursive, MatchingSave
+
+
+class MMKAI_iterative(MMKAI_recursive):
+    # ONLY FOR MKPA with identical profits
+    def _open_branch(self, current_itemclass: int, current_knapsack: int, heuristic_solution: list[MatchingSave],
+                     key: tuple | None = None) -> list | None:
+        """
+        Creates the stack entry for the branch following the given node. An entry consists of the item class, the
+        knapsack, the value change, the trail mark, the first fixed_to below the heuristic solution, the next fixed_to,
+        the fixed_to at which the current direction stops and the transposition key of the node
+        """
+        current_itemclass, current_knapsack, cval_change = self._next_position(current_itemclass, current_knapsack,
+                                                                               heuristic_solution)
+        if current_itemclass == -1:
+            return None
+        self.current_value += cval_change
+        self.stats.enter()
+
+        current_val = heuristic_solution[current_itemclass].match_vec[current_knapsack]
+        available_spaces = heuristic_solution[current_itemclass].remaining_capacity[current_knapsack] // \
+                           self.item_classes[current_itemclass].weight
+        return [current_itemclass, current_knapsack, cval_change, len(self._trail), current_val - 1,
+                min(current_val, available_spaces + 1), available_spaces + 1, key]
+
+    def _branch(self, current_itemclass: int, current_knapsack: int, heuristic_solution: list[MatchingSave]):
+        stack: list[list] = []
+        entry = self._open_branch(current_itemclass, current_knapsack, heuristic_solution)
+        if entry is not None:
+            stack.append(entry)
+
+        while stack:
+            entry = stack[-1]
+            current_itemclass, current_knapsack, cval_change, mark, downwards, fixed_to, stop, key = entry
+
+            if fixed_to == stop:
+                # every bound changes the matchings, they are restored from the trail before going the other direction
+                self._undo(mark)
+                if stop != -1:
+                    entry[5] = downwards
+                    entry[6] = -1
+                else:
+                    self.current_value -= cval_change
+                    self.stats.leave()
+                    stack.pop()
+                    if key is not None and self.stats.stopped is None:
+                        self._transpositions.store(key, self._incumbent_value() - self.current_value)
+                continue
+
+            if self._stopped():
+                # close every direction of every branch on the stack
+                entry[5] = stop
+                continue
+            entry[5] = fixed_to + 1 if stop != -1 else fixed_to - 1
+
+            U = self._evaluate(current_itemclass, current_knapsack, fixed_to, heuristic_solution)
+            if U == -1:
+                entry[5] = stop
+            elif not self._improves(U):
+                self.stats.pruned += 1
+            else:
+                key = self._transposition_key(current_itemclass, current_knapsack, heuristic_solution)
+                if key is not None and self._transposition_prunes(key):
+                    self.stats.pruned += 1
+                    self.stats.transpositions += 1
+                    continue
+                entry = self._open_branch(current_itemclass, current_knapsack, heuristic_solution, key)
+                if entry is not None:
+                    stack.append(entry)
+                elif key is not None and self.stats.stopped is None:
+                    # there is nothing to branch on, the key is stored like after a searched subtree
+                    self._transpositions.store(key, self._incumbent_value() - self.current_value)
@@ -0,0 +1,117 @@
+# Copyright (c) 2023 Tom Mucke
+"""
+Parallel version of MMKAI_recursive, the search is split as described in src.parallel_search. An open node is sent as
+the matchings of all item classes, the result is identical to MMKAI_recursive.solve.
+
+The callback is called in the process that evaluates the node, on_incumbent only in the main process.
+"""
+import multiprocessing
+import time
+import warnings
+from typing import Callable
+
+from src.MMKAI_recursive import MMKAI_recursive, MatchingSave
+from src.parallel_search import ParallelSearch
+from src.models.knapsack import Knapsack
+from src.models.item_class import ItemClass
+from src.models.item import Item
+from src.models.search_stats import SearchStats
+
+
+class MMKAI_parallel(ParallelSearch, MMKAI_recursive):
+    # ONLY FOR MKPA with identical profits
+    def __init__(self, item_classes: list[ItemClass], knapsacks: list[Knapsack], items: list[Item],
+                 processes: int | None = None, tasks_per_process: int = 4,
+                 callback: Callable[[str, SearchStats], None] | None = None, transposition_size: int = 0):
+        super().__init__(item_classes, knapsacks, items, callback, transposition_size)
+        self._init_parallel(processes, tasks_per_process)
+        self._depth = 0
+
+    def _bound(self, current_itemclass: int, current_knapsack: int, fixed_to: int,
+               previous_matchings: list[MatchingSave]):
+        if self._tasks is not None:
+            self._order += 1
+        return super()._bound(current_itemclass, current_knapsack, fixed_to, previous_matchings)
+
+    def _branch(self, current_itemclass: int, current_knapsack: int, heuristic_solution: list[MatchingSave]):
+        if self._tasks is not None and self._depth == self._split_depth:
+            self._order += 1
+            self._add_task((current_itemclass, current_knapsack, self.current_value,
+                            self._snapshot(heuristic_solution)))
+            return
+        self._depth += 1
+        super()._branch(current_itemclass, current_knapsack, heuristic_solution)
+        self._depth -= 1
+
+    def _snapshot(self, matchings: list[MatchingSave]) -> list[tuple]:
+        return [(matching_save.remaining_capacity.copy(), matching_save.match_vec.copy(), matching_save.count.copy(),
+                 matching_save.free.copy(), [edges.copy() for edges in matching_save.assigned])
+                for matching_save in matchings]
+
+    def _restore(self, snapshot: list[tuple]) -> list[MatchingSave]:
+        matchings = []
+        for item_class, (remaining_capacity, match_vec, count, free, assigned) in zip(self.item_classes, snapshot):
+            matching_save = MatchingSave(remaining_capacity, item_class)
+            matching_save.match_vec = match_vec
+            matching_save.count = count
+            matching_save.free = free
+            matching_save.assigned = assigned
+            for edges in assigned:
+                for position, edge in enumerate(edges):
+                    matching_save.position[edge] = position
+            matching_save.size = len(item_class.items) - sum(free)
+            matchings.append(matching_save)
+        return matchings
+
+    def _search_task(self, payload: tuple, depth: int):
+        current_itemclass, current_knapsack, current_value, snapshot = payload
+        root_value, self.current_value = self.current_value, current_value
+        self._trail.clear()
+        self._depth = depth
+        self.stats.depth = depth
+        matchings = self._restore(snapshot)
+
+        # the incumbent might have improved since the task was created
+        if self._improves(self._upper_bound(current_itemclass, matchings)):
+            self._branch(current_itemclass, current_knapsack, matchings)
+        else:
+            self.stats.pruned += 1
+        self.current_value = root_value
+        self._depth = 0
+        self.stats.depth = 0
+
+    def _split(self, search_root: Callable[[], None]) -> list[tuple]:
+        # the subtrees are not searched here, so the transposition table is only used by the workers
+        transpositions, self._transpositions = self._transpositions, None
+        tasks = super()._split(search_root)
+        self._transpositions = transpositions
+        return tasks
+
+    def solve(self, return_stats: bool = False, *, time_limit: float | None = None, node_limit: int | None = None,
+              on_incumbent: Callable[[int, dict[Knapsack, list[Item]]], None] | None = None) -> (
+            int, dict[Knapsack, set[Item]]):
+        if self.solved or self.processes <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+            if not self.solved and self.processes > 1:
+                warnings.warn("MMKAI_parallel requires the fork start method, solving sequentially")
+            return super().solve(return_stats, time_limit=time_limit, node_limit=node_limit,
+                                 on_incumbent=on_incumbent)
+
+        self._time_limit = time_limit
+        self._node_limit = node_limit
+        self._on_incumbent = on_incumbent
+        self.stats.start = time.perf_counter()
+        matchings = self._initial_matchings()
+        initial_value = self.best_solution_value
+        tasks = self._split(lambda: self._branch(-1, len(self.knapsacks), matchings))
+        if on_incumbent is not None and self.best_solution_value > initial_value:
+            self._report_incumbent()
+
+        if tasks:
+            self._solve_tasks(tasks, on_incumbent)
+
+        self.solved = True
+        self._transform_best_solution()
+        self.stats.finish(self.best_solution_value, self._remaining_upper_bound(matchings))
+        if return_stats:
+            return self.best_solution_value, self.transformed_best_solution, self.stats
+        return self.best_solution_value, self.transformed_best_solution
@@ -1,41 +1,34 @@
 # Copyright (c) 2023 Tom Mucke
 
-import collections
-
-import networkx as nx
+import time
+from typing import Callable
 
 from src.models.knapsack import Knapsack
 from src.models.item_class import ItemClass
 from src.models.item import Item
+from src.models.search_stats import SearchStats
+from src.models.transposition_table import TranspositionTable
 
-from copy import deepcopy
-
-def copy_graph(graph: nx.Graph):
-    G = graph.__class__() # This copys the graph and is faster than copy since there are no labels
-    G.graph.update(graph.graph)
-    G.add_nodes_from((n, d) for n, d in graph._node.items())
-    G.add_edges_from(
-        graph.edges
-    )
-    return G
 
 class MatchingSave:
-    def __init__(self, matching: dict, graph: nx.Graph, remaining_capacity: list[int], match_vec: list[int],
-                 item_class: ItemClass):
-        self.matching = matching
-        self.graph = graph
+    """
+    Saves the matching of one item class. The items are grouped into types (see ItemClass.prepare) and only the number
+    of items of every type in every knapsack is stored: count holds the number of items on every edge and free the
+    number of unmatched items of every type. assigned holds the edges with at least one item of every knapsack and
+    position the index of an edge within assigned. size is the number of matched items
+    """
+    def __init__(self, remaining_capacity: list[int], item_class: ItemClass):
+        self.count = [0 for _ in item_class._indices]
+        self.free = [len(items) for items in item_class._types]
+        self.assigned: list[list[int]] = [[] for _ in remaining_capacity]
+        self.position = [-1 for _ in item_class._indices]
+        self.size = 0
         self.remaining_capacity = remaining_capacity.copy()
-        self.match_vec = match_vec
+        self.match_vec = [0 for _ in remaining_capacity]
         self.item_class = item_class
 
-    def __deepcopy__(self, memodict=None):
-        if memodict is None:
-            memodict = {}
-        return MatchingSave(self.matching.copy(), copy_graph(self.graph),
-                            self.remaining_capacity.copy(), self.match_vec.copy(), self.item_class)
-
     def __str__(self):
-        return f"MatchingSave(matching={self.matching}, graph={self.graph}, " \
+        return f"MatchingSave(count={self.count}, free={self.free}, " \
                f"remaining_capacity={self.remaining_capacity}, " \
                f"match_vec={self.match_vec}, item_class={self.item_class})"
 
@@ -45,7 +38,8 @@ class MatchingSave:
 
 class MMKAI_recursive:
     # ONLY FOR MKPA with identical profits
-    def __init__(self, item_classes: list[ItemClass], knapsacks: list[Knapsack], items: list[Item]):
+    def __init__(self, item_classes: list[ItemClass], knapsacks: list[Knapsack], items: list[Item],
+                 callback: Callable[[str, SearchStats], None] | None = None, transposition_size: int = 0):
         self.knapsacks = knapsacks
         self.item_classes = item_classes
         self.item_classes.sort(key=lambda x: x.weight)
@@ -59,16 +53,111 @@ class MMKAI_recursive:
             assert item_class.profit == 1
 
         self.best_solution_value = -1
-        self.best_solution: list[MatchingSave] = []
+        # the number of items on every edge for every item class
+        self.best_solution: list[list[int]] = []
+
+        # every change of the matchings is saved here so it can be undone when backtracking
+        self._trail: list[tuple] = []
 
         self.current_value = 0
 
+        # the callback is called with "node" after every evaluated node and "incumbent" after every new best solution
+        self.stats = SearchStats()
+        self.callback = callback
+
+        # bounds of the states that were already searched, at most transposition_size states are kept
+        self._transpositions = TranspositionTable(transposition_size) if transposition_size > 0 else None
+
+        # limits and incumbent callback of solve
+        self._time_limit: float | None = None
+        self._node_limit: int | None = None
+        self._on_incumbent: Callable[[int, dict[Knapsack, list[Item]]], None] | None = None
+
         self.solved = False
 
+    def _set(self, values: list[int], index: int, value: int):
+        """
+        Sets values[index] to value and saves the old value on the trail
+        """
+        self._trail.append((values, index, values[index]))
+        values[index] = value
+
+    def _move(self, matching_save: MatchingSave, item_type: int, from_edge: int, to_edge: int, amount: int = 1):
+        """
+        Moves amount items of the given type from one edge to another (-1 stands for the unmatched items) and saves
+        the move on the trail
+        """
+        count = matching_save.count
+        position = matching_save.position
+        removed_position = -1
+        if from_edge != -1:
+            count[from_edge] -= amount
+            if count[from_edge] == 0:
+                removed_position = position[from_edge]
+                edges = matching_save.assigned[matching_save.item_class._indices[from_edge]]
+                last = edges.pop()
+                if last != from_edge:
+                    edges[removed_position] = last
+                    position[last] = removed_position
+                position[from_edge] = -1
+        else:
+            matching_save.free[item_type] -= amount
+            matching_save.size += amount
+        if to_edge != -1:
+            if count[to_edge] == 0:
+                edges = matching_save.assigned[matching_save.item_class._indices[to_edge]]
+                position[to_edge] = len(edges)
+                edges.append(to_edge)
+            count[to_edge] += amount
+        else:
+            matching_save.free[item_type] += amount
+            matching_save.size -= amount
+        self._trail.append((matching_save, item_type, from_edge, to_edge, amount, removed_position))
+
+    def _undo(self, mark: int):
+        """
+        Undoes all changes on the trail after mark. Since the changes are undone in reverse order the matchings are
+        restored exactly, including the order of the edges in assigned
+        """
+        start = time.perf_counter()
+        trail = self._trail
+        while len(trail) > mark:
+            change = trail.pop()
+            if len(change) == 3:
+                change[0][change[1]] = change[2]
+                continue
+            matching_save, item_type, from_edge, to_edge, amount, removed_position = change
+            count = matching_save.count
+            position = matching_save.position
+            indices = matching_save.item_class._indices
+            if to_edge != -1:
+                count[to_edge] -= amount
+                if count[to_edge] == 0:
+                    # the edge was appended last, so it is still the last one
+                    matching_save.assigned[indices[to_edge]].pop()
+                    position[to_edge] = -1
+            else:
+                matching_save.free[item_type] -= amount
+                matching_save.size += amount
+            if from_edge != -1:
+                if count[from_edge] == 0:
+                    edges = matching_save.assigned[indices[from_edge]]
+                    if removed_position < len(edges):
+                        edges.append(edges[removed_position])
+                        position[edges[removed_position]] = len(edges) - 1
+                        edges[removed_position] = from_edge
+                    else:
+                        edges.append(from_edge)
+                    position[from_edge] = removed_position
+                count[from_edge] += amount
+            else:
+                matching_save.free[item_type] += amount
+                matching_save.size -= amount
+        self.stats.add_time("undo", start)
+
     def _upper_bound(self, current_fixed_itemclass, previous_matchings) -> int:
 
-        prerequire = sum(previous_matchings[current_fixed_itemclass].match_vec[knapsack] for knapsack in
-                         range(len(self.knapsacks)))
+        prerequire = previous_matchings[current_fixed_itemclass].size
 
         remaining_capacity = sum(previous_matchings[current_fixed_itemclass].remaining_capacity) - prerequire * \
                                 self.item_classes[current_fixed_itemclass].weight
@@ -83,357 +172,536 @@ class MMKAI_recursive:
 
         for i in range(current_fixed_itemclass + 1, len(self.item_classes)):
             remaining_items_in_class = len(self.item_classes[i].items)
-            while remaining_capacity > self.item_classes[i].weight and remaining_items_in_class > 0:
+            while remaining_capacity >= self.item_classes[i].weight and remaining_items_in_class > 0:
                 val += self.item_classes[i].profit
                 remaining_capacity -= self.item_classes[i].weight
                 remaining_items_in_class -= 1
 
         return val
 
-    def _reduce_matching_by_one(self, current_itemclass: int,
-                                knapsack_to_reduce_index: int,
-                                matching: dict, graph: nx.Graph, remaining_capacity: list, matching_vec: list) -> bool:
+    def _reduce_matching_by_one(self, knapsack_to_reduce_index: int, matching_save: MatchingSave,
+                                changed: set[int]) -> bool:
         """
-        Attempts to reduce matching at given index by one without changing matching count in higher knapsacks
+        Attempts to reduce matching at given index by one without changing matching count in previous knapsacks
         or decreasing total matching count
         """
-        # DFS
-        checked = set()
-        stack: collections.deque[tuple[tuple[int, int] | int, tuple | bool]] = \
-            collections.deque([(i, False) for i in matching if isinstance(i, tuple) and i[0] == knapsack_to_reduce_index])
-        checked.update(i[0] for i in stack)
+        return self._move_item_out(matching_save, knapsack_to_reduce_index, knapsack_to_reduce_index + 1, changed)
+
+    def _move_item_out(self, matching_save: MatchingSave, knapsack_to_reduce_index: int, first_target: int,
+                       changed: set[int]) -> bool:
+        """
+        Searches an alternating path that moves one item out of the given knapsack into a knapsack with an index of at
+        least first_target and enough remaining capacity. The matching count of all other knapsacks on the path and
+        the total matching count stay the same
+        """
+        item_class = matching_save.item_class
+        weight = item_class.weight
+        indptr = item_class._indptr
+        indices = item_class._indices
+        edge_type = item_class._edge_type
+        remaining_capacity = matching_save.remaining_capacity
+        match_vec = matching_save.match_vec
+        # DFS, every entry is a knapsack that has to hand over one item together with the entry it was reached from
+        # and the edges of the item it receives. All items of a type can reach the same knapsacks, so every type is
+        # only expanded once
+        checked = {knapsack_to_reduce_index}
+        checked_types = set()
+        stack: list[tuple[int, tuple | None, int, int]] = [(knapsack_to_reduce_index, None, -1, -1)]
         while stack:
             x = stack.pop()
-            vertex = x[0]
-            if isinstance(vertex, Item):
-                # vertex is an item
-                # get all neighbouring knapsacks
-                knapsacks = [(i, x) for i in graph.neighbors(vertex) if i not in checked]
-                stack.extend(knapsacks)
-                checked.update((knapsack[0] for knapsack in knapsacks))
-            else:
-                # vertex is a knapsack
-                if vertex in matching:
-                    if matching[vertex] not in checked:
-                        stack.append((matching[vertex], x))
-                        checked.add(matching[vertex])
-                elif vertex[0] > current_itemclass:
-                    # we can reduce the matching
-                    # construct the path
-                    path = []
-                    while x:
-                        path.append(x[0])
-                        x = x[1]
-                    # reduce the matching
-                    for i in range(0, len(path) - 1, 2):
-                        matching[path[i]] = path[i + 1]
-                        matching[path[i + 1]] = path[i]
-                    matching.pop(path[-1])
-                    remaining_capacity[knapsack_to_reduce_index] += self.item_classes[current_itemclass].weight
-                    remaining_capacity[vertex[0]] -= self.item_classes[current_itemclass].weight
-                    matching_vec[knapsack_to_reduce_index] -= 1
-                    matching_vec[vertex[0]] += 1
-                    return True
+            for edge in matching_save.assigned[x[0]]:
+                item_type = edge_type[edge]
+                if item_type in checked_types:
+                    continue
+                checked_types.add(item_type)
+                for target_edge in range(indptr[item_type], indptr[item_type + 1]):
+                    knapsack = indices[target_edge]
+                    if knapsack in checked:
+                        continue
+                    checked.add(knapsack)
+                    if knapsack >= first_target and \
+                            remaining_capacity[knapsack] - match_vec[knapsack] * weight >= weight:
+                        # we can reduce the matching
+                        # every knapsack on the path hands over one item to its successor
+                        changed.add(knapsack_to_reduce_index)
+                        changed.add(knapsack)
+                        self._set(match_vec, knapsack_to_reduce_index, match_vec[knapsack_to_reduce_index] - 1)
+                        self._set(match_vec, knapsack, match_vec[knapsack] + 1)
+                        self._move(matching_save, item_type, edge, target_edge)
+                        while x[1]:
+                            self._move(matching_save, edge_type[x[2]], x[2], x[3])
+                            x = x[1]
+                        return True
+                    stack.append((knapsack, x, edge, target_edge))
 
         return False
 
-    def _increase_matching_by_one(self, current_itemclass, knapsack_to_increase_index: int, matching: dict,
-                                  graph: nx.Graph, remaining_capacity: list[int], matching_vec: list) -> bool:
+    def _increase_matching_by_one(self, current_itemclass: int, knapsack_to_increase_index: int,
+                                  matching_save: MatchingSave, changed: set[int]) -> bool:
         """
-        Attempts to increase matching at given index by one without changing matching count in higher knapsacks
+        Attempts to increase matching at given index by one without changing matching count in previous knapsacks
         or changing total matching count
         """
-        # DFS
-        checked = set()
-        stack: collections.deque[tuple[tuple[int, int] | int, tuple | bool]] = \
-            collections.deque([(i, False) for i in graph.nodes if isinstance(i, tuple)
-             and i[0] == knapsack_to_increase_index and i not in matching])
-        checked.update(i[0] for i in stack)
+        weight = self.item_classes[current_itemclass].weight
+        match_vec = matching_save.match_vec
+        if matching_save.remaining_capacity[knapsack_to_increase_index] - \
+                match_vec[knapsack_to_increase_index] * weight < weight:
+            return False
+        return self._pull_item(matching_save, knapsack_to_increase_index, False, changed)
+
+    def _augment_to_knapsack(self, matching_save: MatchingSave, free_knapsack: int, changed: set[int]) -> bool:
+        """
+        Searches an augmenting path from a knapsack with enough remaining capacity for one more item of this class
+        to an unmatched item and moves the items along it
+        """
+        return self._pull_item(matching_save, free_knapsack, True, changed)
+
+    def _pull_item(self, matching_save: MatchingSave, knapsack_to_increase_index: int, from_unmatched: bool,
+                   changed: set[int]) -> bool:
+        """
+        Searches a path that moves one more item into the given knapsack. The item is either an unmatched one or
+        taken from a knapsack with a higher index, the matching count of all other knapsacks on the path stays the same
+        """
+        item_class = matching_save.item_class
+        indptr = item_class._indptr
+        indices = item_class._indices
+        edge_type = item_class._edge_type
+        eligible_edges = item_class._eligible_edges
+        count = matching_save.count
+        free = matching_save.free
+        match_vec = matching_save.match_vec
+        # DFS, every entry is a knapsack that needs one more item together with the entry it was reached from and
+        # the edges of the item it has to hand over to that entry. All items of a type can reach the same knapsacks,
+        # so every type is only expanded once
+        checked = {knapsack_to_increase_index}
+        checked_types = set()
+        stack: list[tuple[int, tuple | None, int, int]] = [(knapsack_to_increase_index, None, -1, -1)]
         while stack:
             x = stack.pop()
-            vertex = x[0]
-            if isinstance(vertex, Item):
-                # vertex is an item
-                if vertex in matching and matching[vertex] not in checked:
-                    stack.append((matching[vertex], x))
-                    checked.add(matching[vertex])
-            else:
-                # vertex is a knapsack
-                if vertex[0] <= current_itemclass:
-                    # get all neighbouring items
-                    items = {i for i in graph.neighbors(vertex) if i not in checked}
-                    checked.update(items)
-                    stack.extend([(i, x) for i in items])
-                elif vertex in matching:
-                    # we can increase the matching
-                    # construct the path
-                    path = [vertex]
-                    while x:
-                        path.append(x[0])
-                        x = x[1]
-                    # increase the matching
-                    for i in range(1, len(path), 2):
-                        matching[path[i]] = path[i + 1]
-                        matching[path[i + 1]] = path[i]
-                    matching.pop(vertex)
-                    remaining_capacity[knapsack_to_increase_index] -= self.item_classes[current_itemclass].weight
-                    remaining_capacity[vertex[0]] += self.item_classes[current_itemclass].weight
-                    matching_vec[knapsack_to_increase_index] += 1
-                    matching_vec[vertex[0]] -= 1
-                    return True
+            for target_edge in eligible_edges[x[0]]:
+                item_type = edge_type[target_edge]
+                if item_type in checked_types:
+                    continue
+                checked_types.add(item_type)
+                if from_unmatched and free[item_type] > 0:
+                    edge = -1
+                    knapsack = -1
+                else:
+                    for edge in range(indptr[item_type], indptr[item_type + 1]):
+                        knapsack = indices[edge]
+                        if count[edge] == 0 or knapsack in checked:
+                            continue
+                        checked.add(knapsack)
+                        if not from_unmatched and knapsack > knapsack_to_increase_index:
+                            break
+                        stack.append((knapsack, x, edge, target_edge))
+                    else:
+                        continue
+                # we can increase the matching
+                # every knapsack on the path receives one item from its successor
+                changed.add(knapsack_to_increase_index)
+                self._set(match_vec, knapsack_to_increase_index, match_vec[knapsack_to_increase_index] + 1)
+                if knapsack != -1:
+                    changed.add(knapsack)
+                    self._set(match_vec, knapsack, match_vec[knapsack] - 1)
+                self._move(matching_save, item_type, edge, target_edge)
+                while x[1]:
+                    self._move(matching_save, edge_type[x[2]], x[2], x[3])
+                    x = x[1]
+                return True
         return False
 
-    def _improve_matching(self, matching, graph, itemclass: ItemClass, match_vec, remaining_capacity):
+    def _improve_matching(self, matching_save: MatchingSave, remaining_capacity: list[int]):
         """
-        Bases on Hopcroft-Karp algorithm and its implementation in networkx
-
-        Aric A. Hagberg, Daniel A. Schult and Pieter J. Swart,
-        “Exploring network structure, dynamics, and function using NetworkX”,
-        in Proceedings of the 7th Python in Science Conference (SciPy2008),
-        Gäel Varoquaux, Travis Vaught, and Jarrod Millman (Eds), (Pasadena, CA USA), pp. 11–15, Aug 2008
+        Increases the matching of the item class to a maximal one with the Hopcroft-Karp algorithm on the types of the
+        class and the knapsacks, which take items as long as their remaining capacity allows
 
         John E. Hopcroft and Richard M. Karp. “An n^{5 / 2} Algorithm for Maximum Matchings in Bipartite Graphs”
         In: SIAM Journal of Computing 2.4 (1973), pp. 225–231.
         https://doi.org/10.1137/0202019
-
-        License and Copyright of NetworkX:
-        NetworkX is distributed with the 3-clause BSD license.
-
-        ::
-
-           Copyright (C) 2004-2023, NetworkX Developers
-           Aric Hagberg <hagberg@lanl.gov>
-           Dan Schult <dschult@colgate.edu>
-           Pieter Swart <swart@lanl.gov>
-           All rights reserved.
-
-           Redistribution and use in source and binary forms, with or without
-           modification, are permitted provided that the following conditions are
-           met:
-
-             * Redistributions of source code must retain the above copyright
-               notice, this list of conditions and the following disclaimer.
-
-             * Redistributions in binary form must reproduce the above
-               copyright notice, this list of conditions and the following
-               disclaimer in the documentation and/or other materials provided
-               with the distribution.
-
-             * Neither the name of the NetworkX Developers nor the names of its
-               contributors may be used to endorse or promote products derived
-               from this software without specific prior written permission.
-
-           THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
-           "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
-           LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
-           A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
-           OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
-           SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
-           LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
-           DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
-           THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
-           (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
-           OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
-        """
-        items = itemclass.items
-        distances = {}
-        queue = collections.deque()
-
-        def breadth_first_search():
-            for v in items:
-                if matching.get(v, None) is None:
-                    distances[v] = 0
-                    queue.append(v)
-                else:
-                    distances[v] = float("inf")
-            distances[None] = float("inf")
-            while queue:
-                v = queue.popleft()
-                if distances[v] < distances[None]:
-                    for u in graph[v]:
-                        if distances[matching.get(u, None)] == float("inf"):
-                            distances[matching.get(u, None)] = distances[v] + 1
-                            queue.append(matching.get(u, None))
-            return distances[None] != float("inf")
-
-        def depth_first_search(v):
-            if v is not None:
-                for u in graph[v]:
-                    if distances[matching.get(u, None)] == distances[v] + 1:
-                        if depth_first_search(matching.get(u, None)):
-                            if u not in matching:
-                                match_vec[u[0]] += 1
-                                remaining_capacity[u[0]] -= itemclass.weight
-                            matching[u] = v
-                            matching[v] = u
-                            return True
-                distances[v] = float("inf")
-                return False
-            return True
-
-        while breadth_first_search():
-            for v in items:
-                if matching.get(v, None) is None:
-                    depth_first_search(v)
-
-    def _adjust_matching(self, matching_save: MatchingSave, remaining_capacity: list[int]):
         """
-        Adjusts matching to current remaining capacity
-        by either increasing or decreasing matching until
-        a feasible maximum matching is found
-        """
-        matching_save.remaining_capacity = remaining_capacity.copy()
         item_class = matching_save.item_class
-        matching = matching_save.matching
-        graph = matching_save.graph
+        weight = item_class.weight
+        indptr = item_class._indptr
+        indices = item_class._indices
+        edge_type = item_class._edge_type
+        free = matching_save.free
+        count = matching_save.count
+        assigned = matching_save.assigned
         match_vec = matching_save.match_vec
+        # a knapsack is free as long as there is enough remaining capacity for one more item of this class. The
+        # search works on the types instead of the items, so several items can be moved along a path at once.
+        # All items of a type and all types in a knapsack are reached at the same time, so every type and every
+        # knapsack is only expanded once, layer holds the distance of the types in a knapsack
+        infinity = len(free) + 1
+        free_types = [t for t in range(len(free)) if free[t] > 0 and indptr[t] < indptr[t + 1]]
+
+        while free_types:
+            # breadth first search, builds the layers of the shortest augmenting paths
+            distances = [infinity] * len(free)
+            layer = [infinity] * len(assigned)
+            for t in free_types:
+                distances[t] = 0
+            free_distance = infinity
+            queue = free_types.copy()
+            for t in queue:
+                if distances[t] >= free_distance:
+                    break
+                for u in indices[indptr[t]:indptr[t + 1]]:
+                    if remaining_capacity[u] >= weight:
+                        if free_distance == infinity:
+                            free_distance = distances[t] + 1
+                    elif layer[u] == infinity:
+                        layer[u] = distances[t] + 1
+                        for edge in assigned[u]:
+                            if distances[edge_type[edge]] == infinity:
+                                distances[edge_type[edge]] = distances[t] + 1
+                                queue.append(edge_type[edge])
+            if free_distance == infinity:
+                break
 
-        # remove all nodes with to little remaining capacity
-        for node in list(graph.nodes):
-            if isinstance(node, tuple) and remaining_capacity[node[0]] != 0 \
-                    and node[1] >= remaining_capacity[node[0]] // item_class.weight:
-                graph.remove_node(node)
-                if node in matching:
-                    x = matching.pop(node)
-                    matching.pop(x)
-                    match_vec[node[0]] -= 1
-                    # find one of the other nodes for this knapsack that will remain and is not yet matched
-                    for i in range(remaining_capacity[node[0]] // item_class.weight):
-                        if (node[0], i) not in matching:
-                            matching[x] = (node[0], i)
-                            matching[(node[0], i)] = x
-                            match_vec[node[0]] += 1
+            # depth first search from every free type, path holds the types of the current path, sources the edge
+            # every type gives its items from (-1 for the unmatched ones) and targets the edge it moves them to.
+            # next_edge is the next edge to check of every type, the edges before it have already been tried in this
+            # phase
+            next_edge = indptr[:-1]
+            for root in free_types:
+                while free[root] > 0 and distances[root] == 0:
+                    path = [root]
+                    sources = [-1]
+                    targets = []
+                    while path:
+                        t = path[-1]
+                        descended = False
+                        while next_edge[t] < indptr[t + 1]:
+                            u = indices[next_edge[t]]
+                            if remaining_capacity[u] >= weight:
+                                if free_distance == distances[t] + 1:
+                                    # augment, move as many items as possible along the path
+                                    targets.append(next_edge[t])
+                                    amount = min(free[root], remaining_capacity[u] // weight,
+                                                 *(count[edge] for edge in sources[1:]))
+                                    self._set(match_vec, u, match_vec[u] + amount)
+                                    remaining_capacity[u] -= amount * weight
+                                    for level in range(len(path) - 1, -1, -1):
+                                        self._move(matching_save, path[level], sources[level], targets[level],
+                                                   amount)
+                                    path = None
+                                    break
+                            elif layer[u] == distances[t] + 1:
+                                for edge in assigned[u]:
+                                    if distances[edge_type[edge]] == distances[t] + 1:
+                                        targets.append(next_edge[t])
+                                        path.append(edge_type[edge])
+                                        sources.append(edge)
+                                        descended = True
+                                        break
+                                if descended:
+                                    break
+                                # there is no augmenting path through u in this phase
+                                layer[u] = infinity
+                            next_edge[t] += 1
+                        if path is None:
                             break
+                        if not descended:
+                            # there is no augmenting path through t in this phase
+                            distances[t] = infinity
+                            path.pop()
+                            sources.pop()
+                            if targets:
+                                targets.pop()
 
-        # if there are increasing capacities, add nodes and edges
-        for i in range(len(self.knapsacks)):
-            for j in range(remaining_capacity[i] // item_class.weight):
-                if (i, j) not in matching:
-                    graph.add_node((i, j))
-                    for item in item_class.items:
-                        if self.knapsacks[i] in item.restrictions:
-                            graph.add_edge((i, j), item)
+            free_types = [t for t in free_types if free[t] > 0]
 
-        for i in range(len(self.knapsacks)):
-            remaining_capacity[i] = remaining_capacity[i] - match_vec[i] * item_class.weight
-
-        # maximize matching by searching for augmenting paths
-        self._improve_matching(matching, graph, item_class, match_vec, remaining_capacity)
+    def _adjust_matching(self, matching_save: MatchingSave, capacity_changes: dict[int, int]) -> set[int]:
+        """
+        Adjusts the maximal matching to the changed remaining capacities (index of the knapsack -> new remaining
+        capacity). Only the changed knapsacks are revisited, one after another so that the matching is maximal after
+        every change: a knapsack that lost capacity only loses an item if it can not be moved into another knapsack,
+        a knapsack that gained capacity receives items as long as there is an augmenting path to it.
+        Returns the knapsacks whose remaining capacity after this item class changed
+        """
+        weight = matching_save.item_class.weight
+        remaining_capacity = matching_save.remaining_capacity
+        match_vec = matching_save.match_vec
+        changed = set()
+        gained = []
+
+        for i, capacity in capacity_changes.items():
+            if remaining_capacity[i] == capacity:
+                continue
+            changed.add(i)
+            if capacity > remaining_capacity[i]:
+                gained.append(i)
+                continue
+            self._set(remaining_capacity, i, capacity)
+            while match_vec[i] * weight > capacity:
+                if not self._move_item_out(matching_save, i, 0, changed):
+                    edge = matching_save.assigned[i][-1]
+                    self._move(matching_save, matching_save.item_class._edge_type[edge], edge, -1)
+                    self._set(match_vec, i, match_vec[i] - 1)
+
+        for i in gained:
+            self._set(remaining_capacity, i, capacity_changes[i])
+            while remaining_capacity[i] - match_vec[i] * weight >= weight and \
+                    self._augment_to_knapsack(matching_save, i, changed):
+                pass
+        return changed
 
     def _lower_bound(self, current_fixed_itemclass: int, current_fixed_knapsack: int, fixed_to: int,
                      previous_matchings: list[MatchingSave]) -> (
             int, list[MatchingSave]):
         # ensure that the matching follows fixed_to
+        start = time.perf_counter()
         current_save = previous_matchings[current_fixed_itemclass]
-        remaining_capacity = previous_matchings[current_fixed_itemclass + 1].remaining_capacity.copy()
+        changed = set()
+        x = True
         if current_save.match_vec[current_fixed_knapsack] < fixed_to:
-            x = self._increase_matching_by_one(current_fixed_itemclass, current_fixed_knapsack,
-                                               current_save.matching, current_save.graph, remaining_capacity,
-                                               current_save.match_vec)
-            if not x:
-                return -1, previous_matchings
-
+            x = self._increase_matching_by_one(current_fixed_itemclass, current_fixed_knapsack, current_save, changed)
         elif current_save.match_vec[current_fixed_knapsack] > fixed_to:
-            x = self._reduce_matching_by_one(current_fixed_itemclass, current_fixed_knapsack,
-                                             current_save.matching, current_save.graph, remaining_capacity,
-                                             current_save.match_vec)
-            if not x:
-                return -1, previous_matchings
+            x = self._reduce_matching_by_one(current_fixed_knapsack, current_save, changed)
+        if not x:
+            self.stats.add_time("matching", start)
+            return -1, previous_matchings
 
         bound = self.current_value
 
-        # ensure all following matchings are valid and maximal
+        # ensure all following matchings are valid and maximal, only the knapsacks whose remaining capacity changed
+        # are passed on to the next item class
         for i in range(current_fixed_itemclass + 1, len(self.item_classes)):
-            self._adjust_matching(previous_matchings[i], remaining_capacity)
-            bound += sum(previous_matchings[i].match_vec) * self.item_classes[i].profit
+            previous_save = previous_matchings[i - 1]
+            weight = previous_save.item_class.weight
+            changed = self._adjust_matching(previous_matchings[i], {
+                k: previous_save.remaining_capacity[k] - previous_save.match_vec[k] * weight for k in changed})
+            bound += previous_matchings[i].size * self.item_classes[i].profit
+        self.stats.add_time("matching", start)
 
         return bound, previous_matchings
 
-    def _branch(self, current_itemclass: int, current_knapsack: int, heuristic_solution: list[MatchingSave]):
+    def _next_position(self, current_itemclass: int, current_knapsack: int,
+                       heuristic_solution: list[MatchingSave]) -> (int, int, int):
+        """
+        Returns the next item class and knapsack to branch on aswell as the value added to current_value by entering a
+        new item class. The last knapsack of a class and the last class are never branched on, -1 is returned for them
+        """
         cval_change = 0
         if current_knapsack >= len(self.knapsacks) - 1:
             current_itemclass += 1
             current_knapsack = 0
             if current_itemclass >= len(self.item_classes) - 1:
-                return
+                return -1, -1, 0
             cval_change = sum(heuristic_solution[current_itemclass].match_vec) \
                           * self.item_classes[current_itemclass].profit
-            self.current_value += cval_change
         else:
             current_knapsack += 1
+        return current_itemclass, current_knapsack, cval_change
 
+    def _branch(self, current_itemclass: int, current_knapsack: int, heuristic_solution: list[MatchingSave]):
+        current_itemclass, current_knapsack, cval_change = self._next_position(current_itemclass, current_knapsack,
+                                                                               heuristic_solution)
+        if current_itemclass == -1:
+            return
+        self.current_value += cval_change
+        self.stats.enter()
 
         current_val = heuristic_solution[current_itemclass].match_vec[current_knapsack]
         available_spaces = heuristic_solution[current_itemclass].remaining_capacity[current_knapsack] // \
                            self.item_classes[current_itemclass].weight
-        m = deepcopy(heuristic_solution)
+        # every bound changes the matchings, they are restored from the trail before going the other direction
+        mark = len(self._trail)
         for i in range(current_val, available_spaces + 1):
-            if not self._bound(current_itemclass, current_knapsack, i, m):
+            if not self._bound(current_itemclass, current_knapsack, i, heuristic_solution):
                 break
-        if current_val > 0:  # deepcopy is expensive
-            m = deepcopy(heuristic_solution)
-            for i in range(current_val - 1, -1, -1):
-                if not self._bound(current_itemclass, current_knapsack, i, m):
-                    break
+        self._undo(mark)
+        for i in range(current_val - 1, -1, -1):
+            if not self._bound(current_itemclass, current_knapsack, i, heuristic_solution):
+                break
+        self._undo(mark)
+        self.stats.leave()
         self.current_value -= cval_change
 
-    def _bound(self, current_itemclass: int, current_knapsack: int, fixed_to: int,
-               previous_matchings: list[MatchingSave]):
+    def _evaluate(self, current_itemclass: int, current_knapsack: int, fixed_to: int,
+                  previous_matchings: list[MatchingSave]) -> int:
+        """
+        Calculates both bounds of a node and saves the lower bound if it is a new best solution. Returns the upper
+        bound or -1 if the node is infeasible
+        """
+        stats = self.stats
+        stats.nodes += 1
+
         # calculate upper bound
+        start = time.perf_counter()
         U = self._upper_bound(current_itemclass, previous_matchings) # in theorey this does not need to be done for every fixed_to
+        stats.add_time("upper_bound", start)
 
         if U == -1:
-            return False
+            stats.infeasible += 1
+            return -1
 
-        # calculate lower bound
+        # calculate lower bound, the time of the matching adjustment in it is only counted as matching
+        start = time.perf_counter()
+        matching = stats.times.get("matching", 0.0)
         L, heuristic_solution = self._lower_bound(current_itemclass, current_knapsack, fixed_to, previous_matchings)
+        stats.add_time("lower_bound", start + stats.times.get("matching", 0.0) - matching)
 
         assert L == sum(sum(i.match_vec) for i in heuristic_solution) or L == -1, \
             f"Lower bound is incorrect, it should be {sum(sum(i.match_vec) for i in heuristic_solution)} " \
             f"but is {L}. The number of matchings is {[sum(i.match_vec) for i in heuristic_solution]} " \
-            f"{[len(i.matching) for i in heuristic_solution]}"
+            f"{[i.size for i in heuristic_solution]}"
 
         if L == -1:
-            return False
+            stats.infeasible += 1
+            return -1
 
-        if L > self.best_solution_value:
-            self.best_solution_value = L
-            self.best_solution = deepcopy(heuristic_solution)
+        if self._improves(L):
+            self._save_solution(L, heuristic_solution)
+        self._notify("node")
+        return U
 
-        if U > self.best_solution_value:
-            self._branch(current_itemclass, current_knapsack, heuristic_solution)
+    def _bound(self, current_itemclass: int, current_knapsack: int, fixed_to: int,
+               previous_matchings: list[MatchingSave]):
+        """
+        Evaluates a node and searches its subtree. Returns False if the node is infeasible or the search has to stop
+        """
+        if self._stopped():
+            return False
+        U = self._evaluate(current_itemclass, current_knapsack, fixed_to, previous_matchings)
+        if U == -1:
+            return False
+
+        if not self._improves(U):
+            self.stats.pruned += 1
+            return True
+        key = self._transposition_key(current_itemclass, current_knapsack, previous_matchings)
+        if key is not None and self._transposition_prunes(key):
+            self.stats.pruned += 1
+            self.stats.transpositions += 1
+            return True
+        self._branch(current_itemclass, current_knapsack, previous_matchings)
+        if key is not None and self.stats.stopped is None:
+            self._transpositions.store(key, self._incumbent_value() - self.current_value)
         return True
 
-    def solve(self) -> (int, dict[Knapsack, set[Item]]):
-        if not self.solved:
-            remaining_capacity = [k.capacity for k in self.knapsacks]
-            matchings = []
-            L = 0
-            for item_class in self.item_classes:
-                graph = copy_graph(item_class._graph)
-                graph.remove_nodes_from(list((i, j) for i in range(len(self.knapsacks))
-                                             for j in range(remaining_capacity[i] // item_class.weight,
-                                                            item_class._available_spaces[i])))
-                matching = nx.algorithms.bipartite.hopcroft_karp_matching(graph, item_class.items)
-                match_vec = [0 for _ in self.knapsacks]
-                for i, knapsack in enumerate(self.knapsacks):
-                    for j in range(min(remaining_capacity[i] // item_class.weight, item_class._available_spaces[i])):
-                        if (i, j) in matching:
-                            match_vec[i] += 1
-                matchings.append(MatchingSave(matching, graph, remaining_capacity, match_vec, item_class))
-                L += item_class.profit * sum(match_vec)
-                remaining_capacity = [remaining_capacity[i] - match_vec[i] * item_class.weight for i in
-                                      range(len(self.knapsacks))]
-            self.best_solution_value = L
-            self.best_solution = deepcopy(matchings)
+    def _transposition_key(self, current_itemclass: int, current_knapsack: int,
+                           previous_matchings: list[MatchingSave]) -> tuple | None:
+        """
+        Returns the state of a node or None if there is no transposition table. The subtree of a node only depends on
+        the remaining capacities before its item class and the fixed matching counts of the item class, nodes with
+        the same state differ only in current_value
+        """
+        if self._transpositions is None:
+            return None
+        matching_save = previous_matchings[current_itemclass]
+        return (current_itemclass, current_knapsack, tuple(matching_save.remaining_capacity),
+                tuple(matching_save.match_vec[:current_knapsack + 1]))
 
+    def _transposition_prunes(self, key: tuple) -> bool:
+        """
+        Checks if the subtree of a state that was already searched can not contain a better solution. After the
+        search of a subtree no solution in it is better than the incumbent, so the value it adds to current_value is
+        at most the value of the incumbent minus current_value
+        """
+        bound = self._transpositions.get(key)
+        return bound is not None and not self._improves(self.current_value + bound)
+
+    def _incumbent_value(self) -> int:
+        return self.best_solution_value
+
+    def _improves(self, value: int) -> bool:
+        """
+        Checks if a solution with the given value would be better than the best solution found so far
+        """
+        return value > self.best_solution_value
+
+    def _notify(self, event: str):
+        if self.callback is not None:
+            self.callback(event, self.stats)
+
+    def _save_solution(self, value: int, matchings: list[MatchingSave]):
+        self.best_solution_value = value
+        self.best_solution = [matching_save.count.copy() for matching_save in matchings]
+        self.stats.improved(value)
+        self._notify("incumbent")
+        if self._on_incumbent is not None:
+            self._report_incumbent()
+
+    def _report_incumbent(self):
+        self._transform_best_solution()
+        self._on_incumbent(self.best_solution_value, self.transformed_best_solution)
+
+    def _stopped(self) -> bool:
+        """
+        Checks if the time limit or the node limit of solve is reached
+        """
+        return self.stats.limit_reached(self._time_limit, self._node_limit, self._node_count())
+
+    def _node_count(self) -> int:
+        return self.stats.nodes
+
+    def _remaining_upper_bound(self, matchings: list[MatchingSave]) -> int:
+        """
+        Returns the upper bound of the part of the search tree that was not searched. The depth first search leaves
+        nodes open on the first level, so this is the bound all nodes of the first level share
+        """
+        if self.stats.stopped is None or len(self.item_classes) < 2:
+            return self.best_solution_value
+        cval_change = matchings[0].size * self.item_classes[0].profit
+        self.current_value += cval_change
+        U = self._upper_bound(0, matchings)
+        self.current_value -= cval_change
+        return max(U, self.best_solution_value)
+
+    def _initial_matchings(self) -> list[MatchingSave]:
+        """
+        Matches the item classes one after another starting with the lightest one, this is the first solution
+        """
+        remaining_capacity = [k.capacity for k in self.knapsacks]
+        matchings = []
+        L = 0
+        for item_class in self.item_classes:
+            matching_save = MatchingSave(remaining_capacity, item_class)
+            matchings.append(matching_save)
+            start = time.perf_counter()
+            self._improve_matching(matching_save, remaining_capacity)
+            self.stats.add_time("matching", start)
+            L += item_class.profit * sum(matching_save.match_vec)
+        self._save_solution(L, matchings)
+        self._trail.clear()  # the initial matchings are never undone
+        return matchings
+
+    def _transform_best_solution(self):
+        self.transformed_best_solution = {i: [] for i in self.knapsacks}
+        for item_class, count in zip(self.item_classes, self.best_solution):
+            # the items of every type are handed out to its edges in order
+            for t, items in enumerate(item_class._types):
+                start = 0
+                for edge in range(item_class._indptr[t], item_class._indptr[t + 1]):
+                    knapsack = self.knapsacks[item_class._indices[edge]]
+                    self.transformed_best_solution[knapsack].extend(items[start:start + count[edge]])
+                    start += count[edge]
+
+    def solve(self, return_stats: bool = False, *, time_limit: float | None = None, node_limit: int | None = None,
+              on_incumbent: Callable[[int, dict[Knapsack, list[Item]]], None] | None = None) -> (
+            int, dict[Knapsack, set[Item]]):
+        """
+        Returns the value and the items of every knapsack of the best solution, if return_stats is set the
+        SearchStats of the search are returned as well.
+
+        The search stops after time_limit seconds or node_limit evaluated nodes and returns the best solution found
+        so far, the upper bound of the remaining search and the gap are saved in the stats. on_incumbent is called
+        with the value and the items of every knapsack of every new best solution
+        """
+        if not self.solved:
+            self._time_limit = time_limit
+            self._node_limit = node_limit
+            self._on_incumbent = on_incumbent
+            self.stats.start = time.perf_counter()
+            matchings = self._initial_matchings()
             self._branch(-1, len(self.knapsacks), matchings)
             self.solved = True
+            self._transform_best_solution()
+            self.stats.finish(self.best_solution_value, self._remaining_upper_bound(matchings))
 
-            self.transformed_best_solution = {i: [] for i in self.knapsacks}
-            for matching_save in self.best_solution:
-                for a, b in matching_save.matching.items():
-                    if isinstance(a, Item):
-                        self.transformed_best_solution[self.knapsacks[b[0]]].append(a)
-
+        if return_stats:
+            return self.best_solution_value, self.transformed_best_solution, self.stats
         return self.best_solution_value, self.transformed_best_solution
@@ -10,62 +10,52 @@ which was extended to allow for multiple knapsacks
 import collections
 
 from src.MTM_EXTENDED_recursive import MTM_EXTENDED_recursive
-from src.models.knapsack import Knapsack
 from src.models.item import Item
-import gurobipy as grb
 
 
 class MTM_EXTENDED_iterative(MTM_EXTENDED_recursive):
+    def _unwind(self, stack: collections.deque[tuple[int, Item, bool]]):
+        """
+        Undoes every branch on the stack, used when the search stops early
+        """
+        while stack:
+            current_knapsack, item, included = stack.pop()
+            if included:
+                self._unpack(current_knapsack, item)
+            self.stats.leave()
+            self._set_eligible(current_knapsack, item, True)
+            self._undo_reductions()
+
     def _solve(self, current_knapsack=0):
+        # the branched items, included is set while the subtree with the item in the knapsack is searched
         stack: collections.deque[tuple[int, Item, bool]] = collections.deque()
 
-        U = self._upper_bound(current_knapsack)
-
-        L, heuristic_solution = self._lower_bound(current_knapsack)
-
-        if L > self.best_solution_value:
-            self.best_solution_value = L
-            self.best_solution = {k: set(v).union(self.current_solution[k]) for k, v in heuristic_solution.items()}
-
-        while U > self.best_solution_value:
-            while True:
-                backtrack = False
-                while not heuristic_solution[self.knapsacks[current_knapsack]]:
-                    current_knapsack += 1
-                    if current_knapsack >= len(self.knapsacks) - 1:
-                        backtrack = True
-                        break
-                if backtrack:
-                    break
-                item = heuristic_solution[self.knapsacks[current_knapsack]].pop(0)
-                self.knapsacks[current_knapsack].eligible_items.remove(item)
+        while True:
+            if self._stopped():
+                self._unwind(stack)
+                return
+            branch = self._evaluate(current_knapsack)
+            if branch is not None:
+                current_knapsack, item = branch
+                self._set_eligible(current_knapsack, item, False)
 
                 # add item to knapsack
-                self.current_solution[self.knapsacks[current_knapsack]].add(item)
-                self.current_value += item.profit
-                self.knapsacks[current_knapsack].remaining_capacity -= item.weight
-                self.items.remove(item)
+                self._pack(current_knapsack, item)
+                self.stats.enter()
                 stack.append((current_knapsack, item, True))
-
-                U = self._upper_bound(current_knapsack)
+                continue
+            self._undo_reductions()
 
             while stack:
-                # unbranch
-                current_knapsack, item, one = stack.pop()
-
-                if one:
-                    self.current_solution[self.knapsacks[current_knapsack]].remove(item)
-                    self.current_value -= item.profit
-                    self.knapsacks[current_knapsack].remaining_capacity += item.weight
-                    self.items.append(item)
+                current_knapsack, item, included = stack.pop()
+                if included:
+                    # remove item from knapsack and search the other branch
+                    self._unpack(current_knapsack, item)
+                    stack.append((current_knapsack, item, False))
                     break
-                else:
-                    self.knapsacks[current_knapsack].eligible_items.add(item)
+                # unbranch
+                self.stats.leave()
+                self._set_eligible(current_knapsack, item, True)
+                self._undo_reductions()
             else:
-                break
-
-            L, heuristic_solution = self._lower_bound(current_knapsack)
-
-            if L > self.best_solution_value:
-                self.best_solution_value = L
-                self.best_solution = {k: set(v).union(self.current_solution[k]) for k, v in heuristic_solution.items()}
+                return
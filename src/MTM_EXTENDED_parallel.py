@@ -0,0 +1,129 @@
+# Copyright (c) 2023 Tom Mucke
+"""
+Parallel version of MTM_EXTENDED_iterative, the search is split as described in src.parallel_search. An open node is
+sent as the items added to every knapsack, the eligible items of every knapsack and the items removed by reductions (all
+as bitsets of the positions in the weight order), solutions are sent back the same way.
+
+The result is identical to MTM_EXTENDED_iterative.solve. With a presolve_interval the reductions in the workers depend on
+the shared incumbent, so a tie can be won by another solution of the same value.
+
+The callback and the node log are called in the process that evaluates the node, on_incumbent only in the main
+process. The main process checks the cancel event of solve while it waits for the workers and passes it on to them.
+"""
+import contextlib
+import multiprocessing
+import threading
+import warnings
+from typing import Callable
+
+from src.MTM_EXTENDED_iterative import MTM_EXTENDED_iterative
+from src.MTM_EXTENDED_recursive import _cancel_on_signals
+from src.parallel_search import ParallelSearch
+from src.models.knapsack import Knapsack
+from src.models.item import Item
+from src.models.search_stats import SearchStats
+
+
+class MTM_EXTENDED_parallel(ParallelSearch, MTM_EXTENDED_iterative):
+    def __init__(self, item_classes, knapsacks: list[Knapsack], items: list[Item], processes: int | None = None,
+                 tasks_per_process: int = 4, callback: Callable[[str, SearchStats], None] | None = None,
+                 surrogate_cache_size: int = 4096, bound: str = "adaptive", presolve: bool = True,
+                 presolve_interval: int | None = None, lower_bound_cache_size: int = 4096):
+        super().__init__(item_classes, knapsacks, items, callback, surrogate_cache_size, bound, presolve,
+                         presolve_interval, lower_bound_cache_size)
+        self._init_parallel(processes, tasks_per_process)
+        # eligible items and all items at the root of the search
+        self._initial_eligible = self._eligible.copy()
+        self._initial_items = self._by_weight.mask
+
+    def _evaluate(self, current_knapsack: int) -> tuple[int, Item] | None:
+        if self._tasks is not None:
+            self._order += 1
+            if self.stats.depth == self._split_depth:
+                self._add_task((current_knapsack, self._snapshot()))
+                return None
+        return super()._evaluate(current_knapsack)
+
+    def _snapshot(self) -> tuple[list[int], list[int], int]:
+        packed = [self._by_weight.bitset(self.current_solution[knapsack]) for knapsack in self.knapsacks]
+        removed = self._initial_items & ~self._by_weight.mask
+        for packed_items in packed:
+            removed &= ~packed_items
+        return packed, self._eligible.copy(), removed
+
+    def _apply(self, snapshot: tuple[list[int], list[int], int]):
+        """
+        Moves the search to the node of the snapshot, the search has to be at the root
+        """
+        packed, eligible, removed = snapshot
+        for index, (packed_items, eligible_items) in enumerate(zip(packed, eligible)):
+            for item in self._by_weight.items_of(self._initial_eligible[index] & ~eligible_items):
+                self._set_eligible(index, item, False)
+            for item in self._by_weight.items_of(packed_items):
+                self._pack(index, item)
+        for item in self._by_weight.items_of(removed):
+            self._remove_item(item)
+
+    def _revert(self, snapshot: tuple[list[int], list[int], int]):
+        """
+        Moves the search from the node of the snapshot back to the root
+        """
+        packed, eligible, removed = snapshot
+        for item in self._by_weight.items_of(removed):
+            self._restore_item(item)
+        for index, (packed_items, eligible_items) in enumerate(zip(packed, eligible)):
+            for item in self._by_weight.items_of(packed_items):
+                self._unpack(index, item)
+            for item in self._by_weight.items_of(self._initial_eligible[index] & ~eligible_items):
+                self._set_eligible(index, item, True)
+
+    def _search_task(self, payload: tuple, depth: int):
+        current_knapsack, snapshot = payload
+        self.stats.depth = depth
+        self._apply(snapshot)
+        self._solve(current_knapsack)
+        self._revert(snapshot)
+        self.stats.depth = 0
+
+    def _shared_solution(self) -> list[int]:
+        return [self._by_weight.bitset(self.best_solution[knapsack]) for knapsack in self.knapsacks]
+
+    def _receive_solution(self, solution: list[int]):
+        self.best_solution = {knapsack: set(self._by_weight.items_of(items))
+                              for knapsack, items in zip(self.knapsacks, solution)}
+
+    def _cancelled(self) -> bool:
+        return self._cancel is not None and self._cancel.is_set()
+
+    def _attach(self, incumbent, nodes, cancel):
+        super()._attach(incumbent, nodes, cancel)
+        self._cancel = cancel
+
+    def solve(self, return_stats: bool = False, *, time_limit: float | None = None, node_limit: int | None = None,
+              on_incumbent: Callable[[int, dict[Knapsack, set[Item]]], None] | None = None,
+              deadline: float | None = None, cancel: threading.Event | None = None, handle_signals: bool = False,
+              log_interval: float | None = None) -> (int, dict[Knapsack, set[Item]]):
+        if self.solved or self.processes <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+            if not self.solved and self.processes > 1:
+                warnings.warn("MTM_EXTENDED_parallel requires the fork start method, solving sequentially")
+            return super().solve(return_stats, time_limit=time_limit, node_limit=node_limit,
+                                 on_incumbent=on_incumbent, deadline=deadline, cancel=cancel,
+                                 handle_signals=handle_signals, log_interval=log_interval)
+
+        if handle_signals and cancel is None:
+            cancel = threading.Event()
+        self._start(time_limit, node_limit, on_incumbent, deadline, cancel, log_interval)
+        with _cancel_on_signals(cancel) if handle_signals else contextlib.nullcontext():
+            initial_value = self.best_solution_value
+            tasks = self._split(lambda: self._solve(0))
+            if on_incumbent is not None and self.best_solution_value > initial_value:
+                self._report_incumbent()
+
+            if tasks and not self._stopped():
+                self._solve_tasks(tasks, on_incumbent)
+
+        self.solved = True
+        self.stats.finish(self.best_solution_value, self._remaining_upper_bound())
+        if return_stats:
+            return self.best_solution_value, self.best_solution, self.stats
+        return self.best_solution_value, self.best_solution
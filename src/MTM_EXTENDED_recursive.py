@@ -7,13 +7,59 @@ The Idea of this algorithm is based on the MTM Algorithm from
     In: Discrete Applied Mathematics 3 (4), S. 275–288. DOI: 10.1016/0166-218X(81)90005-6.
 which was extended to allow for multiple knapsacks
 """
+import contextlib
+import functools
+import itertools
+import logging
+import signal
+import threading
+import time
+import warnings
+from typing import Callable
+
+from src.models.active_items import ActiveItems
 from src.models.knapsack import Knapsack
 from src.models.item import Item
-import gurobipy as grb
+from src.models.search_stats import SearchStats
+from src.single_knapsack import solve_single_kp
+
+# iterations of the subgradient method per Lagrangian bound and its step size factor
+_LAGRANGIAN_ITERATIONS = 5
+_LAGRANGIAN_STEP = 1.0
+# the adaptive bound always uses the Lagrangian bound for the first nodes it could prune and afterwards when its rate of
+# pruned nodes pays for its cost, a pruned node is assumed to save the evaluation of a subtree of this many nodes and a
+# Lagrangian bound to cost as much as this many evaluated nodes. The decision only depends on these counts, so the
+# search visits the same nodes in every run
+_ADAPTIVE_WARMUP = 20
+_ADAPTIVE_PROBE = 64
+_PRUNED_NODES_SAVED = 32
+_LAGRANGIAN_COST = _LAGRANGIAN_ITERATIONS
+
+_logger = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def _cancel_on_signals(cancel: threading.Event):
+    """
+    Sets cancel on SIGINT and SIGTERM, the previous handlers are restored afterwards
+    """
+    if threading.current_thread() is not threading.main_thread():
+        warnings.warn("Signal handlers can only be set in the main thread, signals do not cancel the search")
+        yield
+        return
+    previous = {signum: signal.signal(signum, lambda *_: cancel.set()) for signum in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        yield
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
 
 
 class MTM_EXTENDED_recursive:
-    def __init__(self, item_classes, knapsacks: list[Knapsack], items: list[Item]):
+    def __init__(self, item_classes, knapsacks: list[Knapsack], items: list[Item],
+                 callback: Callable[[str, SearchStats], None] | None = None, surrogate_cache_size: int = 4096,
+                 bound: str = "adaptive", presolve: bool = True, presolve_interval: int | None = None,
+                 lower_bound_cache_size: int = 4096):
         self.best_solution_value = -1
         self.best_solution = {}
         self.items = items
@@ -23,107 +69,435 @@ class MTM_EXTENDED_recursive:
         self.current_value = 0
         self.current_solution = {k: set() for k in knapsacks}
         self.solved = False
+        # the callback is called with "node" after every evaluated node and "incumbent" after every new best solution
+        self.stats = SearchStats()
+        self.callback = callback
+        # limits, cancel event, incumbent callback and node log of solve
+        self._time_limit: float | None = None
+        self._node_limit: int | None = None
+        self._deadline: float | None = None
+        self._cancel: threading.Event | None = None
+        self._on_incumbent: Callable[[int, dict[Knapsack, set[Item]]], None] | None = None
+        self._log_interval: float | None = None
+        self._next_log = 0.0
+        # values of the surrogate relaxations by capacity and remaining items, the exclude branch of a node has the same
+        # relaxation as the node itself
+        self._surrogate_value = functools.lru_cache(surrogate_cache_size)(self._solve_surrogate) \
+            if surrogate_cache_size > 0 else self._solve_surrogate
+        # solutions of the knapsack problems of the lower bound by capacity and candidates, a knapsack is only solved
+        # again if its remaining capacity or its candidates changed
+        self._candidate_solution = functools.lru_cache(lower_bound_cache_size)(self._solve_candidates) \
+            if lower_bound_cache_size > 0 else self._solve_candidates
+        # "surrogate" only uses the surrogate relaxation, "lagrangian" additionally the Lagrangian relaxation of the
+        # assignment of every item to at most one knapsack (which respects the eligibility) for every node the
+        # surrogate bound does not prune and "adaptive" only if it prunes often enough to pay for its cost
+        assert bound in ("surrogate", "lagrangian", "adaptive")
+        self.bound = bound
+        # the multipliers of the Lagrangian relaxation, the multipliers of the last node are the start of the next one
+        self._multipliers: dict[Item, int] = {}
+        self._lagrangian_tries = 0
+        self._lagrangian_prunes = 0
+        self._lagrangian_skipped = 0
+        # the reduction of the remaining items runs at the root if presolve is set and at every node whose depth is a
+        # multiple of presolve_interval, reductions holds the depth of the node, the knapsack the item was fixed in (None
+        # if it was removed) and the item of every reduction that is not undone yet
+        self.presolve = presolve
+        self.presolve_interval = presolve_interval
+        self._reductions: list[tuple[int, int | None, Item]] = []
+        # capacity of the knapsacks from the index on
+        self._capacities = list(itertools.accumulate((k.capacity for k in reversed(self.knapsacks)), initial=0))[::-1]
         self.all_profit_1 = True
         for item in items:
             if item.profit != 1:
                 self.all_profit_1 = False
+        # the remaining items (not added to a knapsack) ordered by profit per weight and by weight, with identical
+        # profits the lightest items are the best ones, so both bounds only need the weight order
+        self._by_ratio = ActiveItems(items, key=lambda x: x.weight / x.profit)
+        self._by_weight = ActiveItems(items, key=lambda x: x.weight)
+        # bitset of the eligible items of every knapsack
+        self._eligible = [self._by_weight.bitset(item for item in k.eligible_items if item in self._by_weight)
+                          for k in self.knapsacks]
 
-    def _solve_single_kp(self, capacity, items: list[Item]) -> (int, set[Item]):
+    def _solve_single_kp(self, capacity, items: list[Item], profits: list[int] | None = None) -> (int, set[Item]):
         if len(items) == 0:
             return 0, set()
-        if self.all_profit_1:
-            items.sort(key=lambda x: x.weight)
-            x = set()
-            i = items.pop(0)
-            while i.weight <= capacity:
-                x.add(i)
-                capacity -= i.weight
-                if len(items) == 0:
-                    break
-                i = items.pop(0)
-            return len(x), x
+        return solve_single_kp(capacity, items, profits)
 
-        else:
-            model = grb.Model()
-
-            # We will be maximizing
-            model.modelSense = grb.GRB.MAXIMIZE
+    def _remove_item(self, item: Item):
+        """
+        Removes an item that was added to a knapsack from the remaining items
+        """
+        self._by_ratio.remove(item)
+        self._by_weight.remove(item)
 
-            # create variables
-            x = grb.tupledict()
-            for item in items:
-                x[item] = model.addVar(vtype=grb.GRB.BINARY,
-                                       name=f'x[{item.identifier}]',
-                                       obj=item.profit)
+    def _restore_item(self, item: Item):
+        self._by_ratio.add(item)
+        self._by_weight.add(item)
 
-            model.addConstr(grb.quicksum(x[item] * item.weight for item in items) <= capacity, name="knapsack capacity")
+    def _set_eligible(self, current_knapsack: int, item: Item, eligible: bool):
+        knapsack = self.knapsacks[current_knapsack]
+        bit = 1 << self._by_weight.position(item)
+        if eligible:
+            knapsack.eligible_items.add(item)
+            self._eligible[current_knapsack] |= bit
+        else:
+            knapsack.eligible_items.remove(item)
+            self._eligible[current_knapsack] &= ~bit
 
-            model.update()
-            model.optimize()
+    def _upper_bound(self, current_knapsack) -> int:
+        U = self._surrogate_bound(current_knapsack)
+        if self.bound == "surrogate" or not self._improves(U) or not self._use_lagrangian_bound():
+            return U
+        start = time.perf_counter()
+        lagrangian = self._lagrangian_bound(current_knapsack, U)
+        self.stats.add_time("lagrangian_bound", start)
+        self._lagrangian_tries += 1
+        if not self._improves(lagrangian):
+            self._lagrangian_prunes += 1
+        return min(U, lagrangian)
 
-            return model.objVal, {item for item in items if x[item].X > 0.5}
+    def _surrogate_capacity(self, current_knapsack) -> int:
+        """
+        Capacity of the surrogate relaxation, items can only be added to the current knapsack and the ones after it
+        """
+        capacity = self._capacities[current_knapsack]
+        if current_knapsack < len(self.knapsacks):
+            knapsack = self.knapsacks[current_knapsack]
+            capacity -= knapsack.capacity - knapsack.remaining_capacity
+        return capacity
 
-    def _upper_bound(self, current_knapsack) -> int:
+    def _surrogate_bound(self, current_knapsack) -> int:
         # Surrogate Relaxation
-        if current_knapsack == -1:
-            z, _ = self._solve_single_kp(sum((k.capacity for k in self.knapsacks)), self.items.copy())
+        start = time.perf_counter()
+        capacity = self._surrogate_capacity(max(current_knapsack, 0))
+        if self.all_profit_1:
+            z, _, _ = self._by_weight.fitting_prefix(capacity)
+            self.stats.add_time("upper_bound", start)
             return z + self.current_value
-        z, _ = self._solve_single_kp(sum((k.capacity for k in self.knapsacks[current_knapsack:])), self.items.copy())
+        z = self._surrogate_value(capacity, self._by_weight.mask)
+        self.stats.add_time("upper_bound", start)
         return z + self.current_value
 
+    def _solve_surrogate(self, capacity: int, remaining: int) -> int:
+        """
+        Solves the surrogate relaxation for a bitset of the remaining items, the value may be cached
+        """
+        z, _ = self._solve_single_kp(capacity, list(self._by_weight.items_of(remaining)))
+        return z
+
+    def _use_lagrangian_bound(self) -> bool:
+        """
+        Decides if the Lagrangian bound is worth its cost, only called for nodes the surrogate bound does not prune
+        """
+        if self.bound == "lagrangian" or self._lagrangian_tries < _ADAPTIVE_WARMUP:
+            return True
+        if self._lagrangian_prunes * _PRUNED_NODES_SAVED >= self._lagrangian_tries * _LAGRANGIAN_COST:
+            return True
+        # try it from time to time, the pruning rate changes during the search
+        self._lagrangian_skipped += 1
+        return self._lagrangian_skipped % _ADAPTIVE_PROBE == 0
+
+    def _lagrangian_bound(self, current_knapsack, surrogate_bound: int) -> int:
+        """
+        Relaxes that every item is added to at most one knapsack with the multipliers l: every knapsack solves its own
+        knapsack problem over its eligible items with the profits p - l and the sum of l is added. The multipliers
+        are improved with the subgradient method, starting with the multipliers of the last node
+        """
+        current_knapsack = max(current_knapsack, 0)
+        available = self._by_weight.mask
+        knapsacks = []
+        candidates = 0
+        for index in range(current_knapsack, len(self.knapsacks)):
+            knapsack = self.knapsacks[index]
+            eligible = self._eligible[index] & available & self._by_weight.prefix_mask(knapsack.remaining_capacity)
+            if eligible:
+                knapsacks.append((knapsack.remaining_capacity, list(self._by_weight.items_of(eligible))))
+                candidates |= eligible
+        items = list(self._by_weight.items_of(candidates))
+        multipliers = self._multipliers
+        best = surrogate_bound
+        for _ in range(_LAGRANGIAN_ITERATIONS):
+            z = sum(multipliers.get(item, 0) for item in items)
+            taken = dict.fromkeys(items, 0)
+            for capacity, eligible_items in knapsacks:
+                value, x = self._solve_single_kp(capacity, eligible_items,
+                                                 [item.profit - multipliers.get(item, 0) for item in eligible_items])
+                z += value
+                for item in x:
+                    taken[item] += 1
+            best = min(best, z + self.current_value)
+            if not self._improves(best):
+                break
+
+            # subgradient step towards the multipliers with the smallest bound, items taken by several knapsacks
+            # get a higher multiplier and items taken by none a lower one
+            subgradient = {item: 1 - count for item, count in taken.items()
+                           if count != 1 and (count > 1 or multipliers.get(item, 0) > 0)}
+            if not subgradient:
+                break
+            step = _LAGRANGIAN_STEP * (best - max(self.best_solution_value, self.current_value)) / \
+                sum(g * g for g in subgradient.values())
+            for item, g in subgradient.items():
+                change = max(1, round(step * abs(g)))
+                multipliers[item] = max(0, multipliers.get(item, 0) - change if g > 0 else
+                                        multipliers.get(item, 0) + change)
+        return best
+
+    def _reduces(self) -> bool:
+        """
+        Checks if the reduction runs at the current node
+        """
+        depth = self.stats.depth
+        if depth == 0:
+            return self.presolve
+        return self.presolve_interval is not None and depth % self.presolve_interval == 0
+
+    def _reduce(self, current_knapsack) -> bool:
+        """
+        Reduction of the remaining items as in MTM, returns if an item was reduced. An item is removed if it fits into
+        no eligible knapsack or if no solution with the item can be better than the best solution. An item every better
+        solution contains is added to its knapsack if only one knapsack can take it. The bounds are the Dantzig bounds
+        of the surrogate relaxation, the reductions are undone by _undo_reductions when the node is done
+        """
+        start = time.perf_counter()
+        current_knapsack = max(current_knapsack, 0)
+        L, heuristic_solution = self._lower_bound(current_knapsack)
+        if self._improves(L):
+            self._save_solution(L, heuristic_solution)
+
+        depth = self.stats.depth
+        reduced = len(self._reductions)
+        for item in list(self._by_weight):
+            bit = 1 << self._by_weight.position(item)
+            fitting = [index for index in range(current_knapsack, len(self.knapsacks))
+                       if self._eligible[index] & bit and item.weight <= self.knapsacks[index].remaining_capacity]
+            capacity = self._surrogate_capacity(current_knapsack)
+            self._remove_item(item)
+            if not fitting or not self._improves(
+                    self.current_value + item.profit + self._by_ratio.linear_bound(capacity - item.weight)):
+                self._reductions.append((depth, None, item))
+                continue
+            without = self.current_value + self._by_ratio.linear_bound(capacity)
+            self._restore_item(item)
+            if len(fitting) == 1 and not self._improves(without):
+                self._pack(fitting[0], item)
+                self._reductions.append((depth, fitting[0], item))
+        self.stats.reductions += len(self._reductions) - reduced
+        self.stats.add_time("reduction", start)
+        return len(self._reductions) > reduced
+
+    def _undo_reductions(self):
+        """
+        Undoes the reductions of the current node, called when the node is done
+        """
+        depth = self.stats.depth
+        while self._reductions and self._reductions[-1][0] >= depth:
+            _, current_knapsack, item = self._reductions.pop()
+            if current_knapsack is None:
+                self._restore_item(item)
+            else:
+                self._unpack(current_knapsack, item)
+
     def _lower_bound(self, current_knapsack) -> (int, dict[Knapsack, list[Item]]):
+        start = time.perf_counter()
         L = self.current_value
         heuristic_solution = {k: [] for k in self.knapsacks}
-        heuristik_items = self.items.copy()
-        for knapsack in self.knapsacks[current_knapsack:]:
+        # the candidates of a knapsack are the eligible items that are left and not heavier than its capacity
+        available = self._by_weight.mask
+        for index in range(current_knapsack, len(self.knapsacks)):
+            knapsack = self.knapsacks[index]
             k = knapsack.remaining_capacity
-            items = [item for item in heuristik_items if item.weight <= k and item in knapsack.eligible_items]
-            z, x = self._solve_single_kp(k, items)
-            L += z
-            heuristic_solution[knapsack] = sorted(list(x), key=lambda x: x.profit / x.weight, reverse=True)
-
-            heuristik_items = [item for item in heuristik_items if item not in x]
+            candidates = self._eligible[index] & available & self._by_weight.prefix_mask(k)
+            if not candidates:
+                continue
+            if self.all_profit_1:
+                # take the lightest candidates
+                x = []
+                for item in self._by_weight.items_of(candidates):
+                    if item.weight > k:
+                        break
+                    x.append(item)
+                    k -= item.weight
+                L += len(x)
+            else:
+                z, x = self._candidate_solution(k, candidates)
+                L += z
+            heuristic_solution[knapsack] = x
+            available &= ~self._by_weight.bitset(x)
+        self.stats.add_time("lower_bound", start)
         return L, heuristic_solution
 
-    def _solve(self, current_knapsack=0):
+    def _solve_candidates(self, capacity: int, candidates: int) -> (int, list[Item]):
+        """
+        Solves the knapsack problem of the lower bound for a bitset of candidates, the items of the solution are ordered
+        by profit per weight and ties by their position in the weight order, not by the order of the solution set. The
+        solution may be cached, so it must not be changed
+        """
+        z, x = self._solve_single_kp(capacity, list(self._by_weight.items_of(candidates)))
+        return z, sorted(x, key=lambda x: (-x.profit / x.weight, self._by_weight.position(x)))
+
+    def _save_solution(self, value: int, heuristic_solution: dict[Knapsack, list[Item]]):
+        self.best_solution_value = value
+        self.best_solution = {k: set(v).union(self.current_solution[k]) for k, v in heuristic_solution.items()}
+        self.stats.improved(value)
+        self._notify("incumbent")
+        if self._on_incumbent is not None:
+            self._report_incumbent()
+
+    def _report_incumbent(self):
+        self._on_incumbent(self.best_solution_value, self.best_solution)
+
+    def _notify(self, event: str):
+        if self.callback is not None:
+            self.callback(event, self.stats)
+
+    def _incumbent_value(self) -> int:
+        return self.best_solution_value
+
+    def _improves(self, value: int) -> bool:
+        """
+        Checks if a solution with the given value would be better than the best solution found so far
+        """
+        return value > self.best_solution_value
+
+    def _stopped(self) -> bool:
+        """
+        Checks if a limit of solve is reached or the search was cancelled
+        """
+        return self.stats.limit_reached(self._time_limit, self._node_limit, self._node_count(), self._deadline,
+                                        self._cancel)
+
+    def _log_node(self, upper_bound: int):
+        """
+        Logs the progress of the search at most once per log interval
+        """
+        now = time.perf_counter()
+        if now < self._next_log:
+            return
+        self._next_log = now + self._log_interval
+        _logger.info("nodes %d, depth %d, incumbent %d, upper bound %d", self._node_count(), self.stats.depth,
+                     self._incumbent_value(), upper_bound)
+
+    def _node_count(self) -> int:
+        return self.stats.nodes
+
+    def _remaining_upper_bound(self) -> int:
+        """
+        Returns the upper bound of the part of the search tree that was not searched. The bound of the root is used,
+        it holds for every open node
+        """
+        if self.stats.stopped is None:
+            return self.best_solution_value
+        return max(self._upper_bound(0), self.best_solution_value)
+
+    def _pack(self, current_knapsack: int, item: Item):
+        """
+        Adds the item to the knapsack
+        """
+        knapsack = self.knapsacks[current_knapsack]
+        self.current_solution[knapsack].add(item)
+        self.current_value += item.profit
+        knapsack.remaining_capacity -= item.weight
+        self._remove_item(item)
+
+    def _unpack(self, current_knapsack: int, item: Item):
+        knapsack = self.knapsacks[current_knapsack]
+        self.current_solution[knapsack].remove(item)
+        self.current_value -= item.profit
+        knapsack.remaining_capacity += item.weight
+        self._restore_item(item)
+
+    def _evaluate(self, current_knapsack: int) -> tuple[int, Item] | None:
+        """
+        Bounds the node, returns the knapsack and the item to branch on or None if the node is pruned or there is
+        nothing left to branch on
+        """
+        self.stats.nodes += 1
         # calculate upper bound
         U = self._upper_bound(current_knapsack)
+        if self._improves(U) and self._reduces() and self._reduce(current_knapsack):
+            U = self._upper_bound(current_knapsack)
+        if self._log_interval is not None:
+            self._log_node(U)
 
         # calculate lower bound
         L, heuristic_solution = self._lower_bound(current_knapsack)
 
-        if L > self.best_solution_value:
-            self.best_solution_value = L
-            self.best_solution = {k: set(v).union(self.current_solution[k]) for k, v in heuristic_solution.items()}
-
-        if U > self.best_solution_value:
-            # branch
-            while not heuristic_solution[self.knapsacks[current_knapsack]]:
-                current_knapsack += 1
-                if current_knapsack >= len(self.knapsacks) - 1:
-                    return
-            item = heuristic_solution[self.knapsacks[current_knapsack]].pop(0)
-            self.knapsacks[current_knapsack].eligible_items.remove(item)
-
-            # add item to knapsack
-            self.current_solution[self.knapsacks[current_knapsack]].add(item)
-            self.current_value += item.profit
-            self.knapsacks[current_knapsack].remaining_capacity -= item.weight
-            self.items.remove(item)
-            self._solve(current_knapsack)
-
-            # remove item from knapsack
-            self.current_solution[self.knapsacks[current_knapsack]].remove(item)
-            self.current_value -= item.profit
-            self.knapsacks[current_knapsack].remaining_capacity += item.weight
-            self.items.append(item)
-            self._solve(current_knapsack)
-
-            # unbranch
-            self.knapsacks[current_knapsack].eligible_items.add(item)
-
-    def solve(self) -> (int, dict[Knapsack, set[Item]]):
+        if self._improves(L):
+            self._save_solution(L, heuristic_solution)
+        self._notify("node")
+
+        if not self._improves(U):
+            self.stats.pruned += 1
+            return None
+        while not heuristic_solution[self.knapsacks[current_knapsack]]:
+            current_knapsack += 1
+            if current_knapsack >= len(self.knapsacks) - 1:
+                return None
+        return current_knapsack, heuristic_solution[self.knapsacks[current_knapsack]][0]
+
+    def _solve(self, current_knapsack=0):
+        if self._stopped():
+            return
+        branch = self._evaluate(current_knapsack)
+        if branch is None:
+            self._undo_reductions()
+            return
+        current_knapsack, item = branch
+        self._set_eligible(current_knapsack, item, False)
+
+        # add item to knapsack
+        self._pack(current_knapsack, item)
+        self.stats.enter()
+        self._solve(current_knapsack)
+
+        # remove item from knapsack
+        self._unpack(current_knapsack, item)
+        self._solve(current_knapsack)
+
+        # unbranch
+        self.stats.leave()
+        self._set_eligible(current_knapsack, item, True)
+        self._undo_reductions()
+
+    def _start(self, time_limit: float | None, node_limit: int | None,
+               on_incumbent: Callable[[int, dict[Knapsack, set[Item]]], None] | None, deadline: float | None,
+               cancel: threading.Event | None, log_interval: float | None):
+        """
+        Sets the limits and the callbacks of solve and starts the clock of the search
+        """
+        self._time_limit = time_limit
+        self._node_limit = node_limit
+        self._on_incumbent = on_incumbent
+        self._deadline = deadline
+        self._cancel = cancel
+        self._log_interval = log_interval
+        self.stats.start = time.perf_counter()
+        self._next_log = self.stats.start
+
+    def solve(self, return_stats: bool = False, *, time_limit: float | None = None, node_limit: int | None = None,
+              on_incumbent: Callable[[int, dict[Knapsack, set[Item]]], None] | None = None,
+              deadline: float | None = None, cancel: threading.Event | None = None, handle_signals: bool = False,
+              log_interval: float | None = None) -> (int, dict[Knapsack, set[Item]]):
+        """
+        Returns the value and the items of every knapsack of the best solution, if return_stats is set the
+        SearchStats of the search are returned as well.
+
+        The search stops after time_limit seconds or node_limit evaluated nodes, at the deadline (a value of
+        time.monotonic) or once cancel is set and returns the best solution found so far, the upper bound of the
+        remaining search and the gap are saved in the stats. With handle_signals SIGINT and SIGTERM cancel the search
+        as well. on_incumbent is called with the value and the items of every knapsack of every new best solution.
+        With a log_interval the number of nodes, the depth, the best value and the upper bound of the current node
+        are logged every log_interval seconds
+        """
         if not self.solved:
-            self._solve(0)
+            if handle_signals and cancel is None:
+                cancel = threading.Event()
+            self._start(time_limit, node_limit, on_incumbent, deadline, cancel, log_interval)
+            with _cancel_on_signals(cancel) if handle_signals else contextlib.nullcontext():
+                self._solve(0)
             self.solved = True
+            self.stats.finish(self.best_solution_value, self._remaining_upper_bound())
+        if return_stats:
+            return self.best_solution_value, self.best_solution, self.stats
         return self.best_solution_value, self.best_solution
@@ -1,6 +1,12 @@
 from . import models
 from . import gurobi
+from . import single_knapsack
 from . import MTM_EXTENDED_iterative
 from . import MTM_EXTENDED_recursive
+from . import MTM_EXTENDED_parallel
 from . import MMKAI_recursive
+from . import MMKAI_iterative
+from . import MMKAI_parallel
 
+from . import portfolio
+from . import result_cache
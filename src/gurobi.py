@@ -1,17 +1,126 @@
 # Copyright (c) 2023 Tom Mucke
-from typing import Optional
+import collections
+from typing import Hashable, Iterable, Optional
 
 import gurobipy as grb
+import numpy as np
+import scipy.sparse as sp
+from src.MMKAI_recursive import MMKAI_recursive
 from src.models.knapsack import Knapsack
 from src.models.item import Item
+from src.models.item_class import item_classes_of
+
+
+def _groups(knapsacks: list[Knapsack], items: list[Item], aggregate: bool) -> (
+        list[list[Item]], list[tuple[int, Knapsack]]):
+    """
+    Returns the groups of items the model assigns and its columns, a column is a group and a knapsack its items fit
+    into, the columns of a group are consecutive. Without aggregate every item is its own group, otherwise the items
+    with the same profit, weight and knapsacks they fit into are grouped, since they can be exchanged freely
+    """
+    capacities = {knapsack: knapsack.capacity for knapsack in knapsacks}
+    patterns: dict[Hashable, tuple[tuple[Knapsack, ...], list[Item]]] = {}
+    for item in items:
+        pattern = tuple(knapsack for knapsack in dict.fromkeys(item.restrictions)
+                        if capacities.get(knapsack, 0) >= item.weight)
+        key = (item.profit, item.weight, frozenset(pattern)) if aggregate else item
+        patterns.setdefault(key, (pattern, []))[1].append(item)
+
+    groups = []
+    columns = []
+    for pattern, group in patterns.values():
+        columns.extend((len(groups), knapsack) for knapsack in pattern)
+        groups.append(group)
+    return groups, columns
+
+
+def _column_bounds(groups: list[list[Item]], columns: list[tuple[int, Knapsack]]) -> list[int]:
+    """
+    Returns the maximal number of items of every column, limited by the size of the group and the capacity
+    """
+    return [min(len(groups[group]), knapsack.capacity // groups[group][0].weight) for group, knapsack in columns]
+
+
+def _build_matrix_model(model: grb.Model, knapsacks: list[Knapsack], groups: list[list[Item]],
+                        columns: list[tuple[int, Knapsack]]) -> grb.MVar:
+    """
+    Adds an integer variable (the number of items) for every column and the constraints as sparse matrices (one row
+    per group and per knapsack) to the model, the time is linear in the number of columns
+    """
+    knapsack_rows = {knapsack: row for row, knapsack in enumerate(knapsacks)}
+    indices = np.arange(len(columns))
+    x = model.addMVar(len(columns), ub=np.array(_column_bounds(groups, columns)), vtype=grb.GRB.INTEGER,
+                      obj=np.array([groups[group][0].profit for group, _ in columns]))
+
+    # at most all items of a group are added to the knapsacks
+    assignment = sp.csr_matrix((np.ones(len(columns)), (np.array([group for group, _ in columns]), indices)),
+                               shape=(len(groups), len(columns)))
+    model.addMConstr(assignment, x, grb.GRB.LESS_EQUAL, np.array([len(group) for group in groups]))
+
+    # capacity of every knapsack
+    capacity = sp.csr_matrix((np.array([groups[group][0].weight for group, _ in columns]),
+                              (np.array([knapsack_rows[knapsack] for _, knapsack in columns]), indices)),
+                             shape=(len(knapsacks), len(columns)))
+    model.addMConstr(capacity, x, grb.GRB.LESS_EQUAL, np.array([knapsack.capacity for knapsack in knapsacks]))
+    return x
+
+
+def _disaggregate(groups: list[list[Item]], columns: list[tuple[int, Knapsack]], values) -> dict[Item, Knapsack]:
+    """
+    Returns the knapsack of every added item for the number of items of every column, the items of a group are
+    handed out in order
+    """
+    solution = dict()
+    handed_out = [0] * len(groups)
+    for (group, knapsack), value in zip(columns, values):
+        count = round(value)
+        for item in groups[group][handed_out[group]:handed_out[group] + count]:
+            solution[item] = knapsack
+        handed_out[group] += count
+    return solution
+
+
+def _mmkai_start(knapsacks: list[Knapsack], items: list[Item]) -> dict[Knapsack, list[Item]]:
+    """
+    Returns the initial solution of MMKAI (the matchings of the item classes one after another), only for items with
+    profit 1
+    """
+    _, solution = MMKAI_recursive(item_classes_of(items), list(knapsacks), list(items)).solve(node_limit=0)
+    return solution
+
+
+def _start_values(groups: list[list[Item]], columns: list[tuple[int, Knapsack]],
+                  start_solution: dict[Knapsack, Iterable[Item]]) -> list[int]:
+    """
+    Returns the number of items of every column in the solution, items that are not part of the model are ignored
+    """
+    group_of = {item: group for group, items in enumerate(groups) for item in items}
+    counts = collections.Counter((group_of[item], knapsack) for knapsack, items in start_solution.items()
+                                 for item in items if item in group_of)
+    return [counts[column] for column in columns]
 
 
 def solve(knapsacks: list[Knapsack], items: list[Item],
           items_by_weight: Optional[dict[int, list[Item]]] = None, *, threads=0,
-          timelimit: None | int = None) -> tuple[int, dict] | None:
+          timelimit: None | int = None, aggregate: bool = False,
+          start_solution: dict[Knapsack, Iterable[Item]] | str | None = None) -> tuple[int, dict] | None:
+    """
+    Solves the instance with Gurobi, returns the value and the knapsack of every added item (-1 as value if the time
+    limit was reached). With aggregate the model has one integer variable for every group of exchangeable items
+    (same profit, weight and knapsacks) and knapsack instead of one binary variable for every item and knapsack,
+    which removes the symmetry between these items.
+
+    start_solution is given to Gurobi as MIP start, it can be the solution of any solver (the items of every
+    knapsack) or "MMKAI" for the initial solution of MMKAI if every item has profit 1
+    """
     if len(knapsacks) == 0 or len(items) == 0:
         return 0, dict()
 
+    groups, columns = _groups(knapsacks, items, aggregate)
+    if len(columns) == 0:
+        # no item fits into any of its knapsacks, the matrices of the model would have no columns
+        return 0, dict()
+
     model = grb.Model()
     model.setParam('OutputFlag', 0)
     model.setParam('Threads', threads)
@@ -22,35 +131,27 @@ def solve(knapsacks: list[Knapsack], items: list[Item],
     # We will be maximizing
     model.modelSense = grb.GRB.MAXIMIZE
 
-    # create variables
-    x = grb.tupledict()
-    for item in items:
-        for knapsack in item.restrictions:
-            x[item, knapsack] = model.addVar(vtype=grb.GRB.BINARY, name=f'x[{item.identifier},{knapsack.identifier}]',
-                                             obj=item.profit)
-
-    # add constraints
-    model.addConstrs((x.sum(item, '*') <= 1 for item in items))
+    x = _build_matrix_model(model, knapsacks, groups, columns)
 
-    model.addConstrs(
-        (grb.quicksum(x[item, knapsack] * item.weight
-                      for item in items if knapsack in item.restrictions)
-         <= knapsack.capacity for knapsack in knapsacks), name="knapsack capacity")
+    if start_solution == "MMKAI":
+        start_solution = _mmkai_start(knapsacks, items)
+    if start_solution is not None:
+        start = _start_values(groups, columns, start_solution)
+        x.Start = np.array(start)
 
     model.update()
     print("Model created")
     model.optimize()
 
     solution = dict()
-    for item in items:
-        for knapsack in item.restrictions:
-            if x[item, knapsack].X > 0.5:
-                solution[item] = knapsack
+    if model.SolCount > 0:
+        solution = _disaggregate(groups, columns, x.X)
 
     if timelimit is not None and model.status == grb.GRB.TIME_LIMIT:
         return -1, solution
 
-    return model.objVal, solution
+    # the objective is a float, the values of the other solvers are ints
+    return round(model.objVal), solution
 
 
 if __name__ == '__main__':
@@ -0,0 +1,136 @@
+# Copyright (c) 2023 Tom Mucke
+from __future__ import annotations
+
+import bisect
+import itertools
+from typing import Callable, Iterable, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.models.item import Item
+
+
+class ActiveItems(object):
+    """
+    The items of a search in a fixed order (given by key) of which some are removed. Removed items keep their
+    position, so they can be added again in O(log n). Two Fenwick trees hold the prefix sums of the weights and
+    profits of the active items, which allows to find the longest prefix of active items fitting into a capacity in
+    O(log n).
+
+    Sets of items are also represented as bitsets (ints) where bit i stands for the item at position i, mask is the
+    bitset of the active items
+    """
+    __slots__ = ['_items', '_keys', '_position', '_active', '_weights', '_profits', '_step', 'size', 'mask']
+
+    def __init__(self, items: Iterable[Item], key: Callable[[Item], float]):
+        self._items: list[Item] = sorted(items, key=key)
+        self._keys = [key(item) for item in self._items]
+        self._position: dict[Item, int] = {item: i for i, item in enumerate(self._items)}
+        self._active = [True] * len(self._items)
+        n = len(self._items)
+        self.mask = (1 << n) - 1
+        # the trees are 1 indexed, tree[i] holds the sum of the items i - (i & -i) to i - 1
+        self._weights = [0] * (n + 1)
+        self._profits = [0] * (n + 1)
+        for i, item in enumerate(self._items, 1):
+            self._weights[i] += item.weight
+            self._profits[i] += item.profit
+            parent = i + (i & -i)
+            if parent <= n:
+                self._weights[parent] += self._weights[i]
+                self._profits[parent] += self._profits[i]
+        self._step = 1 << (n.bit_length() - 1) if n else 0
+        self.size = n
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self) -> Iterator[Item]:
+        """
+        Iterates over the active items in order
+        """
+        return itertools.compress(self._items, self._active)
+
+    def __contains__(self, item: Item):
+        position = self._position.get(item)
+        return position is not None and self._active[position]
+
+    def _update(self, position: int, sign: int):
+        item = self._items[position]
+        weight = sign * item.weight
+        profit = sign * item.profit
+        i = position + 1
+        while i < len(self._weights):
+            self._weights[i] += weight
+            self._profits[i] += profit
+            i += i & -i
+
+    def remove(self, item: Item):
+        position = self._position[item]
+        assert self._active[position]
+        self._active[position] = False
+        self.mask ^= 1 << position
+        self._update(position, -1)
+        self.size -= 1
+
+    def add(self, item: Item):
+        position = self._position[item]
+        assert not self._active[position]
+        self._active[position] = True
+        self.mask ^= 1 << position
+        self._update(position, 1)
+        self.size += 1
+
+    def fitting_prefix(self, capacity: int) -> (int, int, int):
+        """
+        Returns the profit and the weight of the longest prefix of active items fitting into the capacity and the
+        position of the first item after it (len of all items if every item fits)
+        """
+        position = 0
+        profit = 0
+        remaining = capacity
+        step = self._step
+        while step:
+            i = position + step
+            if i < len(self._weights) and self._weights[i] <= remaining:
+                position = i
+                remaining -= self._weights[i]
+                profit += self._profits[i]
+            step >>= 1
+        return profit, capacity - remaining, position
+
+    def linear_bound(self, capacity: int) -> int:
+        """
+        Returns the bound of the linear relaxation (Dantzig bound) of the active items for the capacity, the key has to
+        order the items by decreasing profit per weight
+        """
+        profit, weight, position = self.fitting_prefix(capacity)
+        if position < len(self._items):
+            critical = self._items[position]
+            profit += (capacity - weight) * critical.profit // critical.weight
+        return profit
+
+    def position(self, item: Item) -> int:
+        return self._position[item]
+
+    def bitset(self, items: Iterable[Item]) -> int:
+        # setting the bits of a bytearray avoids creating a new int for every item
+        bits = bytearray(len(self._items) // 8 + 1)
+        for item in items:
+            position = self._position[item]
+            bits[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(bits, 'little')
+
+    def prefix_mask(self, key: float) -> int:
+        """
+        Returns the bitset of all items (active or not) whose key is at most the given one
+        """
+        return (1 << bisect.bisect_right(self._keys, key)) - 1
+
+    def items_of(self, mask: int) -> Iterator[Item]:
+        """
+        Iterates over the items of a bitset in order
+        """
+        while mask:
+            low = mask & -mask
+            yield self._items[low.bit_length() - 1]
+            mask ^= low
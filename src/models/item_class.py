@@ -1,17 +1,16 @@
 # Copyright (c) 2023 Tom Mucke
 from __future__ import annotations
 
-import networkx as nx
-
 from src.models.item import Item
-from typing import TYPE_CHECKING
+from typing import Iterable, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from src.models.knapsack import Knapsack
 
 
 class ItemClass(object):
-    __slots__ = ['_items', '_profit', '_weight', '_available_spaces', '_graph']
+    __slots__ = ['_items', '_profit', '_weight', '_available_spaces', '_types', '_indptr', '_indices', '_edge_type',
+                 '_eligible_edges']
     lookup = dict()
 
     def __new__(cls, profit: int, weight: int):
@@ -28,8 +27,12 @@ class ItemClass(object):
         self._items = set()
         self._profit = profit
         self._weight = weight
-        self._graph = None
         self._available_spaces = None
+        self._types = None
+        self._indptr = None
+        self._indices = None
+        self._edge_type = None
+        self._eligible_edges = None
 
     def __str__(self):
         return f'ItemClass ({self.profit}, {self.weight})'
@@ -60,13 +63,37 @@ class ItemClass(object):
         return item
 
     def prepare(self, knapsacks: list[Knapsack]):
+        """
+        Creates the bipartite graph between the items of this class and the knapsacks. Items that fit into the same
+        knapsacks can be exchanged freely, so they are grouped into one type and the graph is built between the types
+        and the knapsacks (their index in knapsacks). _types holds the items of every type.
+
+        The edges of type t are _indptr[t] to _indptr[t + 1], _indices holds the knapsack and _edge_type the type of
+        every edge (CSR). _eligible_edges holds the edges of every knapsack
+        """
         self._available_spaces = [min(k.capacity // self._weight, len(self.items)) for k in knapsacks]
-        k = {(i, j): tuple(item for item in self._items if knapsack in item.restrictions)
-             for i, knapsack in enumerate(knapsacks) for j in range(self._available_spaces[i])}
-        self._graph = nx.Graph(k)
-        j = self.items.copy()
-        for i in k.values():
-            j -= set(i)
-
-        for item in j:
-            self._graph.add_node(item)
+        index = {knapsack: i for i, knapsack in enumerate(knapsacks)}
+        types: dict[tuple[int, ...], list[Item]] = {}
+        for item in sorted(self._items, key=lambda x: x.identifier):
+            pattern = tuple(sorted(index[knapsack] for knapsack in item.restrictions
+                                   if knapsack in index and self._available_spaces[index[knapsack]] > 0))
+            types.setdefault(pattern, []).append(item)
+
+        self._types = list(types.values())
+        self._indptr = [0]
+        self._indices = []
+        self._edge_type = []
+        self._eligible_edges = [[] for _ in knapsacks]
+        for t, pattern in enumerate(types):
+            for knapsack in pattern:
+                self._eligible_edges[knapsack].append(len(self._indices))
+                self._indices.append(knapsack)
+                self._edge_type.append(t)
+            self._indptr.append(len(self._indices))
+
+
+def item_classes_of(items: Iterable[Item]) -> list[ItemClass]:
+    """
+    Returns the item classes of the items, ordered by their first item
+    """
+    return list(dict.fromkeys(item.item_class for item in items))
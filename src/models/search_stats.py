@@ -0,0 +1,117 @@
+# Copyright (c) 2023 Tom Mucke
+from __future__ import annotations
+
+import threading
+import time
+
+
+class SearchStats(object):
+    """
+    Counters and timers of a branch and bound search. times holds the seconds spent in the parts of the search (which
+    parts are timed depends on the solver, parts may be nested), improvements holds the seconds since the start of
+    the search and the value of every new best solution.
+
+    stopped is the limit that ended the search early ("time_limit", "node_limit", "deadline" or "cancelled") or None if
+    it was completed, value is the value of the best solution and upper_bound the bound of the part of the search that
+    was not done
+    """
+    __slots__ = ['nodes', 'pruned', 'infeasible', 'transpositions', 'reductions', 'depth', 'max_depth', 'times',
+                 'improvements', 'start', 'total_time', 'stopped', 'value', 'upper_bound']
+
+    def __init__(self):
+        self.nodes = 0
+        self.pruned = 0
+        self.infeasible = 0
+        # nodes pruned because their state was already searched
+        self.transpositions = 0
+        # items removed or fixed by a reduction
+        self.reductions = 0
+        self.depth = 0
+        self.max_depth = 0
+        self.times: dict[str, float] = {}
+        self.improvements: list[tuple[float, int]] = []
+        self.start = time.perf_counter()
+        self.total_time = 0.0
+        self.stopped: str | None = None
+        self.value = -1
+        self.upper_bound = -1
+
+    def __str__(self):
+        return f'SearchStats (nodes={self.nodes}, pruned={self.pruned}, infeasible={self.infeasible}, ' \
+               f'transpositions={self.transpositions}, reductions={self.reductions}, ' \
+               f'max_depth={self.max_depth}, improvements={len(self.improvements)}, ' \
+               f'total_time={self.total_time:.3f}, times={ {k: round(v, 3) for k, v in self.times.items()} }, ' \
+               f'stopped={self.stopped}, value={self.value}, upper_bound={self.upper_bound})'
+
+    def __repr__(self):
+        return str(self)
+
+    def enter(self):
+        """
+        Goes one level deeper into the search tree
+        """
+        self.depth += 1
+        if self.depth > self.max_depth:
+            self.max_depth = self.depth
+
+    def leave(self):
+        self.depth -= 1
+
+    def add_time(self, part: str, start: float):
+        """
+        Adds the time since start (a value of time.perf_counter) to the given part
+        """
+        self.times[part] = self.times.get(part, 0.0) + time.perf_counter() - start
+
+    def improved(self, value: int):
+        self.improvements.append((time.perf_counter() - self.start, value))
+
+    @property
+    def gap(self) -> float:
+        """
+        Relative difference between the upper bound and the value of the best solution, 0 if it is optimal
+        """
+        if self.upper_bound <= self.value:
+            return 0.0
+        if self.value <= 0:
+            return float('inf')
+        return (self.upper_bound - self.value) / self.value
+
+    def limit_reached(self, time_limit: float | None, node_limit: int | None, nodes: int,
+                      deadline: float | None = None, cancel: threading.Event | None = None) -> bool:
+        """
+        Checks if the search has to stop, nodes is the number of nodes the node limit is compared to, deadline is a
+        value of time.monotonic and cancel stops the search once it is set
+        """
+        if self.stopped is None:
+            if node_limit is not None and nodes >= node_limit:
+                self.stopped = "node_limit"
+            elif time_limit is not None and time.perf_counter() - self.start >= time_limit:
+                self.stopped = "time_limit"
+            elif deadline is not None and time.monotonic() >= deadline:
+                self.stopped = "deadline"
+            elif cancel is not None and cancel.is_set():
+                self.stopped = "cancelled"
+        return self.stopped is not None
+
+    def finish(self, value: int, upper_bound: int):
+        self.total_time = time.perf_counter() - self.start
+        self.value = value
+        self.upper_bound = upper_bound
+
+    def merge(self, other: SearchStats):
+        """
+        Adds the counters and timers of a search that ran in parallel to this one
+        """
+        self.nodes += other.nodes
+        self.pruned += other.pruned
+        self.infeasible += other.infeasible
+        if self.stopped is None:
+            self.stopped = other.stopped
+        self.transpositions += other.transpositions
+        self.reductions += other.reductions
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for part, seconds in other.times.items():
+            self.times[part] = self.times.get(part, 0.0) + seconds
+        self.improvements.extend(other.improvements)
+        self.improvements.sort()
@@ -0,0 +1,39 @@
+# Copyright (c) 2023 Tom Mucke
+import collections
+from typing import Hashable
+
+
+class TranspositionTable(object):
+    """
+    Remembers the best bound proven for a state of the search. At most maxsize states are kept, the least recently
+    used state is removed first
+    """
+    __slots__ = ['maxsize', '_bounds']
+
+    def __init__(self, maxsize: int):
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self._bounds: collections.OrderedDict[Hashable, int] = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def __contains__(self, key: Hashable):
+        return key in self._bounds
+
+    def get(self, key: Hashable) -> int | None:
+        bound = self._bounds.get(key)
+        if bound is not None:
+            self._bounds.move_to_end(key)
+        return bound
+
+    def store(self, key: Hashable, bound: int):
+        """
+        Saves the bound for the state, a better (smaller) bound that is already known is kept
+        """
+        known = self._bounds.get(key)
+        if known is None or bound < known:
+            self._bounds[key] = bound
+        self._bounds.move_to_end(key)
+        if len(self._bounds) > self.maxsize:
+            self._bounds.popitem(last=False)
@@ -0,0 +1,233 @@
+# Copyright (c) 2023 Tom Mucke
+"""
+The parts of the parallel solvers that do not depend on the search. The first levels of the search tree are
+enumerated by the main process one level after another, the open nodes below them are solved by a pool of worker
+processes, which take the next open node whenever they are done with one. All workers prune with a shared incumbent.
+
+Every solution is ranked by its value and the position of its subtree in the order of the sequential search. A tie
+is therefore always won by the solution the sequential search would have found first, which makes the result
+identical to the sequential solver.
+
+The workers count their nodes in their own SearchStats, which are merged into stats after the search. For the node
+limit the workers share their node count every _NODE_BATCH nodes.
+"""
+import abc
+import bisect
+import multiprocessing
+import os
+from typing import Callable, Iterator
+
+from src.models.search_stats import SearchStats
+
+_ORDER_RANGE = 2 ** 32
+_NODE_BATCH = 1024
+_POLL_INTERVAL = 0.05
+
+# set in every worker process by _init_worker
+_solver = None
+
+
+def _init_worker(solver, incumbent, nodes, cancel):
+    global _solver
+    _solver = solver
+    _solver._attach(incumbent, nodes, cancel)
+
+
+def _solve_subtree(task):
+    return _solver._solve_subtree(task)
+
+
+class ParallelSearch(abc.ABC):
+    """
+    Mixin for a sequential solver. An open node is a task (order, payload), the solver sets the payload in its search
+    with _add_task and continues the search from it in _search_task
+    """
+
+    def _init_parallel(self, processes: int | None, tasks_per_process: int):
+        self.processes = os.cpu_count() if processes is None else processes
+        self.tasks_per_process = tasks_per_process
+
+        # position of the current node in the sequential search, all nodes of a subtree share the same position
+        self._order = 0
+        self._best_rank = self._rank(self.best_solution_value, 0)
+        # while splitting, the key of the open node that is expanded and the key of the best solution
+        self._prefix: tuple[int, ...] = ()
+        self._best_key: tuple[int, ...] = ()
+        self._split_depth = 0
+        self._tasks: list[tuple] | None = None
+        self._incumbent = None
+        self._found = False
+        # nodes of all processes and the nodes of this process that are already counted in it
+        self._nodes = None
+        self._counted_nodes = 0
+
+    @staticmethod
+    def _rank(value: int, order: int) -> int:
+        return value * _ORDER_RANGE + _ORDER_RANGE - 1 - order
+
+    def _incumbent_rank(self) -> int:
+        if self._incumbent is None:
+            return self._best_rank
+        return self._incumbent.value
+
+    def _incumbent_value(self) -> int:
+        if self._tasks is not None:
+            return self.best_solution_value
+        return self._incumbent_rank() // _ORDER_RANGE
+
+    def _key(self) -> tuple[int, ...]:
+        return self._prefix + (self._order,)
+
+    def _improves(self, value: int) -> bool:
+        if self._tasks is not None:
+            return value > self.best_solution_value or (value == self.best_solution_value and
+                                                        self._key() < self._best_key)
+        return self._rank(value, self._order) > self._incumbent_rank()
+
+    def _node_count(self) -> int:
+        if self._nodes is None:
+            return self.stats.nodes
+        if self.stats.nodes - self._counted_nodes >= _NODE_BATCH:
+            self._count_nodes()
+        return self._nodes.value + self.stats.nodes - self._counted_nodes
+
+    def _count_nodes(self):
+        with self._nodes.get_lock():
+            self._nodes.value += self.stats.nodes - self._counted_nodes
+        self._counted_nodes = self.stats.nodes
+
+    def _save_solution(self, value: int, solution):
+        super()._save_solution(value, solution)
+        if self._tasks is not None:
+            self._best_key = self._key()
+            return
+        self._best_rank = self._rank(value, self._order)
+        self._found = True
+        if self._incumbent is not None:
+            with self._incumbent.get_lock():
+                if self._best_rank > self._incumbent.value:
+                    self._incumbent.value = self._best_rank
+
+    def _add_task(self, payload: tuple):
+        """
+        Saves the current node as open node instead of searching it
+        """
+        self._tasks.append((self._key(), payload))
+
+    @abc.abstractmethod
+    def _search_task(self, payload: tuple, depth: int):
+        """
+        Searches the subtree of an open node at the given depth and returns to the root afterwards
+        """
+
+    def _shared_solution(self):
+        """
+        Returns the best solution in the form that is sent from the workers to the main process
+        """
+        return self.best_solution
+
+    def _receive_solution(self, solution):
+        """
+        Saves a solution sent by a worker as the best solution
+        """
+        self.best_solution = solution
+
+    def _cancelled(self) -> bool:
+        return False
+
+    def _attach(self, incumbent, nodes, cancel):
+        """
+        Runs in every worker with the shared incumbent rank, node count and cancel event
+        """
+        self._incumbent = incumbent
+        self._nodes = nodes
+
+    def _solve_subtree(self, task: tuple) -> tuple[SearchStats, tuple[int, int, object] | None]:
+        """
+        Runs in a worker, returns the stats of the subtree together with the rank, value and solution if a new best
+        solution was found in the subtree
+        """
+        self._order, payload = task
+        self._on_incumbent = None
+        self._found = False
+        start = self.stats.start
+        self.stats = SearchStats()
+        self.stats.start = start
+        self._counted_nodes = 0
+
+        self._search_task(payload, self._split_depth)
+        self._count_nodes()
+        if not self._found:
+            return self.stats, None
+        return self.stats, (self._best_rank, self.best_solution_value, self._shared_solution())
+
+    def _split(self, search_root: Callable[[], None]) -> list[tuple]:
+        """
+        Enumerates the search tree one level after another until there are enough open nodes for the workers, every
+        level only expands the open nodes of the previous one. search_root searches from the root. The solutions found
+        here are reported to on_incumbent only once, by solve.
+
+        The levels are not enumerated in the order of the sequential search, so a node is ordered by its key: the key
+        of the open node it was expanded from followed by its position in that expansion. In the end the open nodes are
+        numbered in the order of their keys, the best solution gets the odd number between the open nodes before and
+        after it
+        """
+        on_incumbent, self._on_incumbent = self._on_incumbent, None
+        self._best_key = ()
+        self._prefix = ()
+        self._order = 0
+        self._tasks = []
+        self._split_depth = 1
+        search_root()
+        while self._tasks and len(self._tasks) < self.processes * self.tasks_per_process and \
+                self.stats.stopped is None:
+            frontier, self._tasks = self._tasks, []
+            self._split_depth += 1
+            for self._prefix, payload in frontier:
+                self._order = 0
+                self._search_task(payload, self._split_depth - 1)
+                if self.stats.stopped is not None:
+                    break
+        if self.stats.stopped is not None:
+            # the enumeration is incomplete, its open nodes are covered by the remaining upper bound
+            self._tasks = []
+
+        keys = [key for key, _ in self._tasks]
+        self._best_rank = self._rank(self.best_solution_value, 2 * bisect.bisect_left(keys, self._best_key) + 1)
+        tasks = [(2 * order, payload) for order, (_, payload) in enumerate(self._tasks, 1)]
+        self._tasks = None
+        self._prefix = ()
+        self._order = 0
+        self._on_incumbent = on_incumbent
+        return tasks
+
+    def _results(self, results, cancel) -> Iterator[tuple[SearchStats, tuple[int, int, object] | None]]:
+        """
+        Yields the results of the workers, _cancelled is checked while waiting and passed on to the workers by setting
+        cancel
+        """
+        while True:
+            try:
+                yield results.next(_POLL_INTERVAL)
+            except multiprocessing.TimeoutError:
+                if self._cancelled():
+                    cancel.set()
+            except StopIteration:
+                return
+
+    def _solve_tasks(self, tasks: list[tuple], on_incumbent: Callable | None):
+        """
+        Solves the open nodes with the pool of workers
+        """
+        context = multiprocessing.get_context("fork")
+        incumbent = context.Value("q", self._best_rank)
+        nodes = context.Value("q", self.stats.nodes)
+        cancel = context.Event()
+        with context.Pool(min(self.processes, len(tasks)), _init_worker, (self, incumbent, nodes, cancel)) as pool:
+            for stats, result in self._results(pool.imap_unordered(_solve_subtree, tasks), cancel):
+                self.stats.merge(stats)
+                if result is not None and result[0] > self._best_rank:
+                    self._best_rank, self.best_solution_value, solution = result
+                    self._receive_solution(solution)
+                    if on_incumbent is not None:
+                        self._report_incumbent()
@@ -0,0 +1,143 @@
+# Copyright (c) 2023 Tom Mucke
+"""
+Races several solvers on the same instance, every solver runs in its own process and the first proven optimal result
+is returned, the other processes are terminated. Which solver is fastest depends on the shape of the instance, the
+portfolio is about as fast as the best of them without having to predict it.
+
+The processes are forked, so they work on copies of the instance and send their solution back as the positions of the
+knapsacks and items in the lists given to solve_portfolio.
+"""
+import multiprocessing
+import os
+import queue
+import time
+import warnings
+from typing import Iterator
+
+from src import gurobi
+from src.MMKAI_recursive import MMKAI_recursive
+from src.MTM_EXTENDED_iterative import MTM_EXTENDED_iterative
+from src.models.knapsack import Knapsack
+from src.models.item import Item
+from src.models.item_class import item_classes_of
+
+_POLL_INTERVAL = 0.05
+# seconds the solvers get after the time limit to send their best solution
+_GRACE_PERIOD = 1.0
+
+
+def _solve_MMKAI(knapsacks: list[Knapsack], items: list[Item], threads: int, time_limit: float | None) -> (
+        tuple[bool, int, dict[Knapsack, list[Item]]]):
+    value, solution, stats = MMKAI_recursive(item_classes_of(items), list(knapsacks), list(items)).solve(
+        True, time_limit=time_limit)
+    return stats.stopped is None, value, solution
+
+
+def _solve_MTM_EXTENDED(knapsacks: list[Knapsack], items: list[Item], threads: int, time_limit: float | None) -> (
+        tuple[bool, int, dict[Knapsack, set[Item]]]):
+    value, solution, stats = MTM_EXTENDED_iterative(item_classes_of(items), list(knapsacks), list(items)).solve(
+        True, time_limit=time_limit)
+    return stats.stopped is None, value, solution
+
+
+def _solve_gurobi(knapsacks: list[Knapsack], items: list[Item], threads: int, time_limit: float | None) -> (
+        tuple[bool, int, dict[Knapsack, list[Item]]]):
+    value, assignment = gurobi.solve(knapsacks, items, threads=threads, timelimit=time_limit, aggregate=True)
+    solution = {knapsack: [] for knapsack in knapsacks}
+    for item, knapsack in assignment.items():
+        solution[knapsack].append(item)
+    return value != -1, sum(item.profit for item in assignment), solution
+
+
+_SOLVERS = {"MMKAI": _solve_MMKAI, "MTM_EXTENDED": _solve_MTM_EXTENDED, "gurobi": _solve_gurobi}
+
+
+def _run(name: str, knapsacks: list[Knapsack], items: list[Item], threads: int, time_limit: float | None, results):
+    """
+    Runs in the process of a solver, puts the name, the error (None if the solver succeeded) and the result into
+    results
+    """
+    try:
+        optimal, value, solution = _SOLVERS[name](knapsacks, items, threads, time_limit)
+    except Exception as error:
+        results.put((name, repr(error), None))
+        return
+    knapsack_positions = {knapsack: i for i, knapsack in enumerate(knapsacks)}
+    item_positions = {item: i for i, item in enumerate(items)}
+    results.put((name, None, (optimal, value, {knapsack_positions[knapsack]: [item_positions[item] for item in packed]
+                                               for knapsack, packed in solution.items()})))
+
+
+def _results(results, processes: list, deadline: float | None) -> Iterator[tuple[str, str | None, tuple | None]]:
+    """
+    Yields the results of the solvers until every process has ended or the deadline is reached
+    """
+    while deadline is None or time.perf_counter() < deadline:
+        try:
+            yield results.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes) and results.empty():
+                return
+
+
+def solve_portfolio(knapsacks: list[Knapsack], items: list[Item], *, threads: int | None = None,
+                    time_limit: float | None = None, solvers: list[str] | None = None,
+                    return_solver: bool = False) -> (int, dict[Knapsack, set[Item]]):
+    """
+    Solves the instance with all solvers at the same time and returns the value and the items of every knapsack of the
+    first proven optimal solution. If no solver proves optimality within time_limit seconds the best solution found is
+    returned. If return_solver is set the name of the solver and whether the solution is proven optimal are returned
+    as well.
+
+    solvers are names of _SOLVERS, by default MMKAI (only if every item has profit 1), MTM_EXTENDED and gurobi. Every
+    solver uses one of the threads (os.cpu_count() by default), gurobi gets the remaining ones
+    """
+    if solvers is None:
+        solvers = [name for name in _SOLVERS if name != "MMKAI" or all(item.profit == 1 for item in items)]
+    if threads is None:
+        threads = os.cpu_count()
+    gurobi_threads = max(1, threads - len(solvers) + 1)
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        warnings.warn(f"solve_portfolio requires the fork start method, solving with {solvers[0]} only")
+        optimal, value, solution = _SOLVERS[solvers[0]](knapsacks, items, threads, time_limit)
+        solution = {knapsack: set(packed) for knapsack, packed in solution.items()}
+        if return_solver:
+            return value, solution, solvers[0], optimal
+        return value, solution
+
+    deadline = None if time_limit is None else time.perf_counter() + time_limit + _GRACE_PERIOD
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [context.Process(target=_run, args=(name, knapsacks, items, gurobi_threads if name == "gurobi" else 1,
+                                                    time_limit, results), daemon=True)
+                 for name in solvers]
+    for process in processes:
+        process.start()
+
+    best = None
+    try:
+        for name, error, result in _results(results, processes, deadline):
+            if error is not None:
+                warnings.warn(f"{name} failed in solve_portfolio: {error}")
+                continue
+            if best is None or result[1] > best[1][1]:
+                best = name, result
+            if result[0]:
+                best = name, result
+                break
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+    if best is None:
+        raise RuntimeError("No solver of the portfolio returned a solution")
+    name, (optimal, value, packed) = best
+    solution = {knapsack: set() for knapsack in knapsacks}
+    for knapsack, positions in packed.items():
+        solution[knapsacks[knapsack]] = {items[i] for i in positions}
+    if return_solver:
+        return value, solution, name, optimal
+    return value, solution
@@ -0,0 +1,187 @@
+# Copyright (c) 2023 Tom Mucke
+"""
+Caches the optimal solutions of instances that are solved again. An instance is identified by its fingerprint, which
+only depends on the capacities of the knapsacks, the profits and weights of the items and the knapsacks every item is
+restricted to, not on the identifiers of the objects or the order of the lists.
+
+For the fingerprint the instance is brought into a canonical form: the knapsacks are sorted by capacity and the items
+that may be packed into them, the items by profit, weight and the positions of their knapsacks. Knapsacks with equal
+capacity are told apart by refining their order until it is stable: in every round they are sorted again by the items
+they may pack, with the positions of the other knapsacks of these items from the previous round. The solution is saved
+as the positions of the items of every knapsack in this form, so it can be mapped to the objects of any instance with
+the same fingerprint. Only knapsacks that are still tied after the refinement stay in the order of the list, an
+instance given in another order may then get another fingerprint, but equal fingerprints always mean equal instances.
+"""
+import collections
+import hashlib
+import json
+import os
+import tempfile
+from typing import Callable, Iterable
+
+from src import gurobi
+from src.models.knapsack import Knapsack
+from src.models.item import Item
+from src.models.item_class import item_classes_of
+
+
+def _ranks(keys: dict) -> dict:
+    """
+    Returns the position of the key of every object among the distinct keys
+    """
+    positions = {key: i for i, key in enumerate(sorted(set(keys.values())))}
+    return {obj: positions[key] for obj, key in keys.items()}
+
+
+def _canonical(knapsacks: list[Knapsack], items: list[Item]) -> (tuple, list[Knapsack], list[Item]):
+    """
+    Returns the canonical form of the instance and its knapsacks and items in the canonical order
+    """
+    items_of: dict[Knapsack, list[Item]] = {knapsack: [] for knapsack in knapsacks}
+    for item in items:
+        for knapsack in item.restrictions:
+            if knapsack in items_of:
+                items_of[knapsack].append(item)
+
+    # refines the ranks of the knapsacks by the items they may pack, whose keys contain the ranks of their other
+    # knapsacks, until the number of distinct ranks does not change anymore
+    ranks = _ranks({knapsack: knapsack.capacity for knapsack in knapsacks})
+    while True:
+        item_keys = {item: (item.profit, item.weight, tuple(sorted(ranks[knapsack] for knapsack in item.restrictions
+                                                                    if knapsack in ranks)))
+                     for item in items}
+        refined = _ranks({knapsack: (ranks[knapsack], tuple(sorted(item_keys[item] for item in items_of[knapsack])))
+                          for knapsack in knapsacks})
+        if len(set(refined.values())) == len(set(ranks.values())):
+            break
+        ranks = refined
+    knapsack_order = sorted(knapsacks, key=ranks.__getitem__)
+    positions = {knapsack: i for i, knapsack in enumerate(knapsack_order)}
+
+    keys = {item: (item.profit, item.weight, tuple(sorted(positions[knapsack] for knapsack in item.restrictions
+                                                          if knapsack in positions)))
+            for item in items}
+    item_order = sorted(items, key=keys.__getitem__)
+    canonical = tuple(knapsack.capacity for knapsack in knapsack_order), tuple(keys[item] for item in item_order)
+    return canonical, knapsack_order, item_order
+
+
+def _hash(canonical: tuple) -> str:
+    return hashlib.sha256(repr(canonical).encode()).hexdigest()
+
+
+def fingerprint(knapsacks: list[Knapsack], items: list[Item]) -> str:
+    return _hash(_canonical(knapsacks, items)[0])
+
+
+class ResultCache(object):
+    """
+    Optimal solutions by the fingerprint of their instance. At most maxsize solutions are kept in memory, the least
+    recently used solution is removed first. With a directory every solution is also saved there as a JSON file, so it
+    outlives the cache and can be shared between processes
+    """
+    __slots__ = ['maxsize', 'directory', '_results', 'hits', 'misses']
+
+    def __init__(self, maxsize: int = 128, directory: str | None = None):
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        # value and the canonical positions of the items of every knapsack
+        self._results: collections.OrderedDict[str, tuple[int, list[list[int]]]] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json')
+
+    def _remember(self, key: str, result: tuple[int, list[list[int]]]):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def _load(self, key: str) -> tuple[int, list[list[int]]] | None:
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+            return result
+        if self.directory is None:
+            return None
+        # a file that cannot be read or has the wrong shape is a miss
+        try:
+            with open(self._path(key)) as file:
+                data = json.load(file)
+            result = data['value'], data['solution']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        self._remember(key, result)
+        return result
+
+    def _save(self, key: str, result: tuple[int, list[list[int]]]):
+        self._remember(key, result)
+        if self.directory is None:
+            return
+        # written to a temporary file first, so a concurrent reader never sees a partial file
+        descriptor, path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump({'value': result[0], 'solution': result[1]}, file)
+        os.replace(path, self._path(key))
+
+    def get(self, knapsacks: list[Knapsack], items: list[Item]) -> tuple[int, dict[Knapsack, set[Item]]] | None:
+        """
+        Returns the value and the items of every knapsack of the cached solution of the instance or None
+        """
+        canonical, knapsack_order, item_order = _canonical(knapsacks, items)
+        result = self._load(_hash(canonical))
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        value, packed = result
+        return value, {knapsack: {item_order[i] for i in positions}
+                       for knapsack, positions in zip(knapsack_order, packed)}
+
+    def store(self, knapsacks: list[Knapsack], items: list[Item], value: int,
+              solution: dict[Knapsack, Iterable[Item]]):
+        """
+        Saves an optimal solution of the instance, given as the items of every knapsack
+        """
+        canonical, knapsack_order, item_order = _canonical(knapsacks, items)
+        positions = {item: i for i, item in enumerate(item_order)}
+        packed = [sorted(positions[item] for item in solution.get(knapsack, ())) for knapsack in knapsack_order]
+        self._save(_hash(canonical), (value, packed))
+
+    def solve(self, solver: Callable, knapsacks: list[Knapsack], items: list[Item], **kwargs) -> (
+            tuple[int, dict]):
+        """
+        Returns the cached solution of the instance or solves it and caches the solution if it is proven optimal.
+        solver is gurobi.solve or a solver class, which is created with the item classes, the knapsacks and the items
+        (functools.partial can set further arguments), kwargs are passed to solve.
+
+        The result has the form of the solver: the knapsack of every added item for gurobi.solve, the items of every
+        knapsack for the solver classes
+        """
+        cached = self.get(knapsacks, items)
+        if solver is gurobi.solve:
+            if cached is not None:
+                value, solution = cached
+                return value, {item: knapsack for knapsack, packed in solution.items() for item in packed}
+            value, assignment = gurobi.solve(knapsacks, items, **kwargs)
+            if value != -1:
+                solution = {knapsack: [] for knapsack in knapsacks}
+                for item, knapsack in assignment.items():
+                    solution[knapsack].append(item)
+                self.store(knapsacks, items, value, solution)
+            return value, assignment
+
+        if cached is not None:
+            return cached
+        value, solution, stats = solver(item_classes_of(items), list(knapsacks), list(items)).solve(True, **kwargs)
+        if stats.stopped is None:
+            self.store(knapsacks, items, value, solution)
+        return value, {knapsack: set(packed) for knapsack, packed in solution.items()}
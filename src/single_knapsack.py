@@ -0,0 +1,120 @@
+# Copyright (c) 2023 Tom Mucke
+"""
+Solves the 0-1 knapsack problem for a single knapsack. Small instances are solved with dynamic programming, larger ones
+with the branch and bound algorithm of Horowitz and Sahni as described in
+
+    Martello, Silvano; Toth, Paolo (1990):
+    Knapsack Problems: Algorithms and Computer Implementations.
+    Chichester: John Wiley & Sons. Chapter 2.5.
+"""
+import bisect
+
+from src.models.item import Item
+
+# instances with at most this many cells (items times capacity) are solved with dynamic programming
+_DP_LIMIT = 200_000
+
+
+def solve_single_kp(capacity: int, items: list[Item], profits: list[int] | None = None) -> (int, set[Item]):
+    """
+    Returns the maximal profit of the items fitting into a knapsack of the given capacity and the items of an optimal
+    solution. profits replaces the profits of the items (in the same order), items without a positive profit are
+    never taken
+    """
+    if profits is None:
+        profits = [item.profit for item in items]
+    kept = [(profit, item) for profit, item in zip(profits, items) if profit > 0 and item.weight <= capacity]
+    profits = [profit for profit, _ in kept]
+    items = [item for _, item in kept]
+    if sum(item.weight for item in items) <= capacity:
+        return sum(profits), set(items)
+    if len(items) * capacity <= _DP_LIMIT:
+        return _dynamic_programming(capacity, items, profits)
+    return _branch_and_bound(capacity, items, profits)
+
+
+def _dynamic_programming(capacity: int, items: list[Item], profits: list[int] | None = None) -> (int, set[Item]):
+    """
+    values[i][c] is the maximal profit of the first i items with capacity c, every row is kept to reconstruct the
+    solution
+    """
+    if profits is None:
+        profits = [item.profit for item in items]
+    values = [[0] * (capacity + 1)]
+    for item, profit in zip(items, profits):
+        previous = values[-1]
+        weight = item.weight
+        values.append(previous[:weight] + [a if a >= b + profit else b + profit
+                                           for a, b in zip(previous[weight:], previous)])
+
+    solution = set()
+    c = capacity
+    for i in range(len(items), 0, -1):
+        if values[i][c] != values[i - 1][c]:
+            solution.add(items[i - 1])
+            c -= items[i - 1].weight
+    return values[-1][capacity], solution
+
+
+def _branch_and_bound(capacity: int, items: list[Item], profits: list[int] | None = None) -> (int, set[Item]):
+    """
+    Horowitz-Sahni: depth first search that always adds as many items as possible in the order of decreasing profit
+    per weight and bounds every node with the linear relaxation (Dantzig bound). Items with the same profit and weight
+    are interchangeable, so they are grouped and the search branches on the number of items taken of every group
+    """
+    if profits is None:
+        profits = [item.profit for item in items]
+    groups: dict[tuple[int, int], list[Item]] = {}
+    for item, profit in zip(items, profits):
+        groups.setdefault((profit, item.weight), []).append(item)
+    order = sorted(groups, key=lambda x: x[0] / x[1], reverse=True)
+    n = len(order)
+    profits = [profit for profit, _ in order]
+    weights = [weight for _, weight in order]
+    counts = [len(groups[group]) for group in order]
+    # prefix sums of the groups, the weights are used to find the critical group of the bound
+    prefix_weights = [0]
+    prefix_profits = [0]
+    for profit, weight, count in zip(profits, weights, counts):
+        prefix_weights.append(prefix_weights[-1] + count * weight)
+        prefix_profits.append(prefix_profits[-1] + count * profit)
+
+    best_value = 0
+    best_solution: list[int] = [0] * n
+    x = [0] * n
+    remaining = capacity
+    value = 0
+    j = 0
+    while True:
+        # upper bound, groups j to critical - 1 fit completely and critical fits partially
+        critical = bisect.bisect_right(prefix_weights, remaining + prefix_weights[j]) - 1
+        bound = prefix_profits[critical] - prefix_profits[j]
+        if critical < n:
+            bound += (remaining - prefix_weights[critical] + prefix_weights[j]) * profits[critical] // weights[critical]
+
+        if best_value < value + bound:
+            # forward steps, take as many items of the remaining groups as possible
+            for k in range(j, n):
+                x[k] = min(counts[k], remaining // weights[k])
+                remaining -= x[k] * weights[k]
+                value += x[k] * profits[k]
+            j = n
+            if value > best_value:
+                best_value = value
+                best_solution = x.copy()
+
+        # backtrack, the last group is never reduced since that can not lead to a better solution
+        if j == n:
+            remaining += x[n - 1] * weights[n - 1]
+            value -= x[n - 1] * profits[n - 1]
+            x[n - 1] = 0
+            j = n - 1
+        i = j - 1
+        while i >= 0 and not x[i]:
+            i -= 1
+        if i < 0:
+            return best_value, {item for group, count in zip(order, best_solution) for item in groups[group][:count]}
+        remaining += weights[i]
+        value -= profits[i]
+        x[i] -= 1
+        j = i + 1
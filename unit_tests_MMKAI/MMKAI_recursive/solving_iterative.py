@@ -0,0 +1,51 @@
+# Copyright (c) 2023 Tom Mucke
+import sys
+
+from src.MMKAI_iterative import MMKAI_iterative
+from unit_tests_MMKAI.MMKAI_recursive.solving_recursive import *
+
+
+class TestMMKAI_solve_iterative(TestMMKAI_solve_recursive):
+    def setUp(self) -> None:
+        self.class_to_test = lambda weightclasses, knapsacks, items: MMKAI_iterative(weightclasses, knapsacks, items)
+
+    def test_same_as_recursive(self):
+        random.seed(1_4142135623)
+        knapsacks = [Knapsack(random.randint(50, 200)) for _ in range(4)]
+        weightclasses = [ItemClass(1, random.randint(1, 30)) for _ in range(4)]
+        items = [random.choice(weightclasses).add_item(random.sample(knapsacks, random.randint(1, 4))) for _ in
+                 range(80)]
+        val, sol = MMKAI_recursive(weightclasses, knapsacks, items).solve()
+        iterative_val, iterative_sol = self.class_to_test(weightclasses, knapsacks, items).solve()
+        self.assertEqual(iterative_val, val)
+        self.assertEqual(iterative_sol, sol)
+
+    def test_same_transpositions_as_recursive(self):
+        # small weights, so different branches reach the same remaining capacities
+        random.seed(0)
+        knapsacks = [Knapsack(random.randint(1, 30)) for _ in range(6)]
+        weightclasses = [ItemClass(1, weight) for weight in random.sample(range(1, 7), 4)]
+        items = [random.choice(weightclasses).add_item(random.sample(knapsacks, random.randint(1, 6))) for _ in
+                 range(80)]
+        val, sol, stats = MMKAI_recursive(weightclasses, knapsacks, items, transposition_size=64).solve(True)
+        iterative_val, iterative_sol, iterative_stats = MMKAI_iterative(weightclasses, knapsacks, items,
+                                                                        transposition_size=64).solve(True)
+        self.assertEqual(iterative_val, val)
+        self.assertEqual(iterative_sol, sol)
+        self.assertGreater(stats.transpositions, 0)
+        self.assertEqual(iterative_stats.transpositions, stats.transpositions)
+        self.assertEqual(iterative_stats.nodes, stats.nodes)
+
+    def test_deep_search_tree(self):
+        # every item fits into a single knapsack and 12 distinct classes give a path through all classes and
+        # knapsacks that is deeper than the recursion limit, the lightest 4 classes fill every small knapsack
+        knapsacks = [Knapsack(10) for _ in range(5)] + [Knapsack(1000)]
+        weightclasses = [ItemClass(1, weight) for weight in range(1, 13)]
+        items = [weightclass.add_item({knapsack}) for weightclass in weightclasses for knapsack in knapsacks[:-1]]
+        recursion_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(100)
+        try:
+            val, sol = self.class_to_test(weightclasses, knapsacks, items).solve()
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+        self.assertEqual(val, 20)
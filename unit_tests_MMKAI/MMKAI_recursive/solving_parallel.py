@@ -0,0 +1,34 @@
+# Copyright (c) 2023 Tom Mucke
+from src.MMKAI_parallel import MMKAI_parallel
+from unit_tests_MMKAI.MMKAI_recursive.solving_recursive import *
+
+
+class TestMMKAI_solve_parallel(TestMMKAI_solve_recursive):
+    def setUp(self) -> None:
+        self.class_to_test = lambda weightclasses, knapsacks, items: MMKAI_parallel(weightclasses, knapsacks, items,
+                                                                                    processes=2)
+
+    def test_same_as_recursive(self):
+        random.seed(0)
+        knapsacks = [Knapsack(random.randint(50, 200)) for _ in range(4)]
+        weightclasses = [ItemClass(1, random.randint(1, 30)) for _ in range(4)]
+        items = [random.choice(weightclasses).add_item(random.sample(knapsacks, random.randint(1, 4))) for _ in
+                 range(80)]
+        val, sol = MMKAI_recursive(weightclasses, knapsacks, items).solve()
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        parallel_val, parallel_sol = solver.solve()
+        self.assertEqual(parallel_val, val)
+        self.assertEqual(parallel_sol, sol)
+
+    def test_split(self):
+        # the open nodes never reach the number of tasks, so the whole tree is searched by the split
+        random.seed(0)
+        knapsacks = [Knapsack(random.randint(50, 200)) for _ in range(4)]
+        weightclasses = [ItemClass(1, random.randint(1, 30)) for _ in range(4)]
+        items = [random.choice(weightclasses).add_item(random.sample(knapsacks, random.randint(1, 4))) for _ in
+                 range(80)]
+        val, sol, stats = MMKAI_recursive(weightclasses, knapsacks, items).solve(True)
+        solver = MMKAI_parallel(weightclasses, knapsacks, items, processes=2, tasks_per_process=100_000)
+        parallel_val, parallel_sol, parallel_stats = solver.solve(True)
+        self.assertEqual(parallel_sol, sol)
+        self.assertLess(parallel_stats.nodes, 2 * stats.nodes)
@@ -172,3 +172,54 @@ class TestMMKAI_solve_recursive(unittest.TestCase):
         self.assertEqual(gurobisolution, grb.GRB.Status.OPTIMAL)
         self.assertEqual(gurobisol, val)
 
+
+    def test_stats(self):
+        knapsacks = [Knapsack(15), Knapsack(4)]
+        weightclasses = [ItemClass(1, 1), ItemClass(1, 2)]
+        items = [weightclasses[0].add_item({knapsacks[1]}) for _ in range(10)]
+        items.extend([weightclasses[1].add_item(set(knapsacks)) for _ in range(10)])
+        items.extend([weightclasses[0].add_item(set(knapsacks)) for _ in range(2)])
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        events = []
+        solver.callback = lambda event, stats: events.append(event)
+        val, sol, stats = solver.solve(return_stats=True)
+        self.assertEqual(val, 12)
+        self.assertIs(stats, solver.stats)
+        self.assertGreater(stats.nodes, 0)
+        self.assertEqual(stats.depth, 0)
+        self.assertEqual(max(value for _, value in stats.improvements), val)
+        self.assertGreaterEqual(stats.total_time, 0)
+        self.assertIn("incumbent", events)
+        self.assertEqual(solver.solve(), (val, sol))
+
+    def test_limits(self):
+        knapsacks = [Knapsack(15), Knapsack(4)]
+        weightclasses = [ItemClass(1, 1), ItemClass(1, 2)]
+        items = [weightclasses[0].add_item({knapsacks[1]}) for _ in range(10)]
+        items.extend([weightclasses[1].add_item(set(knapsacks)) for _ in range(10)])
+        items.extend([weightclasses[0].add_item(set(knapsacks)) for _ in range(2)])
+        incumbents = []
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        val, sol, stats = solver.solve(return_stats=True, node_limit=1,
+                                       on_incumbent=lambda value, solution: incumbents.append(value))
+        self.assertEqual(stats.stopped, "node_limit")
+        self.assertLessEqual(val, 12)
+        self.assertGreaterEqual(stats.upper_bound, 12)
+        self.assertGreaterEqual(stats.gap, 0)
+        self.assertEqual(incumbents, sorted(set(incumbents)))
+        self.assertEqual(incumbents[-1], val)
+
+        # validate solution using gurobi
+        gurobisol, gurobisolution = validate_solution(knapsacks, items, sol)
+        self.assertEqual(gurobisolution, grb.GRB.Status.OPTIMAL)
+
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        val, sol, stats = solver.solve(return_stats=True, time_limit=0)
+        self.assertEqual(stats.stopped, "time_limit")
+        self.assertGreaterEqual(stats.upper_bound, 12)
+
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        val, sol, stats = solver.solve(return_stats=True, time_limit=60)
+        self.assertIsNone(stats.stopped)
+        self.assertEqual(stats.upper_bound, val)
+        self.assertEqual(stats.gap, 0)
@@ -0,0 +1,22 @@
+# Copyright (c) 2023 Tom Mucke
+from unit_tests_MMKAI.MMKAI_recursive.solving_recursive import *
+
+
+class TestMMKAI_solve_transposition(TestMMKAI_solve_recursive):
+    def setUp(self) -> None:
+        self.class_to_test = lambda weightclasses, knapsacks, items: MMKAI_recursive(weightclasses, knapsacks, items,
+                                                                                     transposition_size=64)
+
+    def test_same_as_recursive(self):
+        # small weights, so different branches reach the same remaining capacities
+        random.seed(0)
+        knapsacks = [Knapsack(random.randint(1, 30)) for _ in range(6)]
+        weightclasses = [ItemClass(1, weight) for weight in random.sample(range(1, 7), 4)]
+        items = [random.choice(weightclasses).add_item(random.sample(knapsacks, random.randint(1, 6))) for _ in
+                 range(80)]
+        val, sol = MMKAI_recursive(weightclasses, knapsacks, items).solve()
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        transposition_val, transposition_sol, stats = solver.solve(return_stats=True)
+        self.assertEqual(transposition_val, val)
+        self.assertEqual(transposition_sol, sol)
+        self.assertGreater(stats.transpositions, 0)
@@ -1,10 +1,22 @@
 # Copyright (c) 2023 Tom Mucke
 from src.MTM_EXTENDED_iterative import MTM_EXTENDED_iterative
+from src.MTM_EXTENDED_recursive import MTM_EXTENDED_recursive
 from unit_tests_MMKAI.MTM_EXTENDED.solving_recursive import TestMTM_Extended_solve_recursive
+from unit_tests_MMKAI.instances import random_profit_instance
 
 
 class TestMTM_Extendes_solve_iterative(TestMTM_Extended_solve_recursive):
     def setUp(self) -> None:
-        self.class_to_test = lambda weightclasses, knapsacks, items: MTM_EXTENDED_iterative(item_classes=weightclasses,
-                                                                                           knapsacks=knapsacks,
-                                                                                           items=items)
+        self.class_to_test = lambda weightclasses, knapsacks, items, **kwargs: MTM_EXTENDED_iterative(
+            item_classes=weightclasses, knapsacks=knapsacks, items=items, **kwargs)
+
+    def test_same_as_recursive(self):
+        weightclasses, knapsacks, items = random_profit_instance()
+        val, sol, stats = MTM_EXTENDED_recursive(weightclasses, knapsacks, items).solve(True)
+        weightclasses, knapsacks, items = random_profit_instance()
+        iterative_val, iterative_sol, iterative_stats = self.class_to_test(weightclasses, knapsacks, items).solve(True)
+        self.assertEqual(iterative_val, val)
+        self.assertEqual(iterative_stats.nodes, stats.nodes)
+        self.assertEqual(iterative_stats.max_depth, stats.max_depth)
+        self.assertEqual({k.capacity: sorted(i.weight for i in v) for k, v in iterative_sol.items()},
+                         {k.capacity: sorted(i.weight for i in v) for k, v in sol.items()})
@@ -0,0 +1,43 @@
+# Copyright (c) 2023 Tom Mucke
+from src.MTM_EXTENDED_iterative import MTM_EXTENDED_iterative
+from src.MTM_EXTENDED_parallel import MTM_EXTENDED_parallel
+from unit_tests_MMKAI.MTM_EXTENDED.solving_recursive import TestMTM_Extended_solve_recursive
+from unit_tests_MMKAI.instances import random_profit_instance
+
+
+class TestMTM_Extended_solve_parallel(TestMTM_Extended_solve_recursive):
+    # the number of nodes depends on the timing of the workers
+    sequential = False
+
+    def setUp(self) -> None:
+        self.class_to_test = lambda weightclasses, knapsacks, items, **kwargs: MTM_EXTENDED_parallel(
+            item_classes=weightclasses, knapsacks=knapsacks, items=items, processes=2, **kwargs)
+
+    def test_same_as_iterative(self):
+        weightclasses, knapsacks, items = random_profit_instance()
+        val, sol = MTM_EXTENDED_iterative(weightclasses, knapsacks, items).solve()
+        weightclasses, knapsacks, items = random_profit_instance()
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        parallel_val, parallel_sol = solver.solve()
+        self.assertEqual(parallel_val, val)
+        self.assertEqual({k.capacity: sorted(i.weight for i in v) for k, v in parallel_sol.items()},
+                         {k.capacity: sorted(i.weight for i in v) for k, v in sol.items()})
+
+    def test_split(self):
+        # the open nodes never reach the number of tasks, so the whole tree is searched by the split
+        weightclasses, knapsacks, items = random_profit_instance()
+        val, sol, stats = MTM_EXTENDED_iterative(weightclasses, knapsacks, items).solve(True)
+        weightclasses, knapsacks, items = random_profit_instance()
+        solver = MTM_EXTENDED_parallel(weightclasses, knapsacks, items, processes=2, tasks_per_process=100_000)
+        parallel_val, parallel_sol, parallel_stats = solver.solve(True)
+        self.assertEqual(parallel_val, val)
+        self.assertLess(parallel_stats.nodes, 2 * stats.nodes)
+
+    def test_node_log(self):
+        # the main process only logs the nodes of the split, the workers log their own nodes
+        weightclasses, knapsacks, items = random_profit_instance()
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        with self.assertLogs("src.MTM_EXTENDED_recursive", "INFO") as logs:
+            val, _ = solver.solve(log_interval=0)
+        for output in logs.output:
+            self.assertLessEqual(int(output.split("incumbent ")[1].split(",")[0]), val)
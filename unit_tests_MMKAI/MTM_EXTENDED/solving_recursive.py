@@ -1,15 +1,148 @@
 # Copyright (c) 2023 Tom Mucke
+import os
+import signal
+import threading
+import time
+
+import gurobipy as grb
+
+from src import gurobi
 from src.MTM_EXTENDED_recursive import MTM_EXTENDED_recursive
-from unit_tests_MMKAI.MMKAI_recursive.solving_recursive import TestMMKAI_solve_recursive
+from unit_tests_MMKAI.MMKAI_recursive.solving_recursive import TestMMKAI_solve_recursive, validate_solution
+from unit_tests_MMKAI.instances import random_profit_instance
 
 
 class TestMTM_Extended_solve_recursive(TestMMKAI_solve_recursive):
+    # the nodes of a sequential solver do not depend on the timing, so the searches of two runs can be compared
+    sequential = True
+
     def setUp(self) -> None:
-        self.class_to_test = lambda weightclasses, knapsacks, items: MTM_EXTENDED_recursive(items=items,
-                                                                                            knapsacks=knapsacks,
-                                                                                            item_classes=weightclasses)
+        self.class_to_test = lambda weightclasses, knapsacks, items, **kwargs: MTM_EXTENDED_recursive(
+            items=items, knapsacks=knapsacks, item_classes=weightclasses, **kwargs)
 
     def test_manual_5(self):
         ...
 
-    # TODO add tests where p != 1
+    def test_limits(self):
+        # the Lagrangian bound proves the optimum of this instance at the root, so no limit would be reached
+        class_to_test = self.class_to_test
+
+        def surrogate_only(weightclasses, knapsacks, items):
+            solver = class_to_test(weightclasses, knapsacks, items)
+            solver.bound = "surrogate"
+            return solver
+
+        self.class_to_test = surrogate_only
+        super().test_limits()
+
+    def test_random_profits(self):
+        weightclasses, knapsacks, items = random_profit_instance()
+        expected, _ = gurobi.solve(knapsacks, items)
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        val, sol = solver.solve()
+        self.assertEqual(val, expected)
+
+        # validate solution using gurobi
+        gurobisol, gurobisolution = validate_solution(knapsacks, items, sol)
+        self.assertEqual(gurobisolution, grb.GRB.Status.OPTIMAL)
+        self.assertEqual(gurobisol, val)
+
+    def test_caches(self):
+        # the size argument of every cache and the cached method
+        for size, cached in (("surrogate_cache_size", "_surrogate_value"),
+                             ("lower_bound_cache_size", "_candidate_solution")):
+            with self.subTest(cache=size):
+                weightclasses, knapsacks, items = random_profit_instance()
+                solver = self.class_to_test(weightclasses, knapsacks, items)
+                val, _, stats = solver.solve(True)
+
+                # the cache must not change the search
+                weightclasses, knapsacks, items = random_profit_instance()
+                uncached = self.class_to_test(weightclasses, knapsacks, items, **{size: 0})
+                uncached_val, _, uncached_stats = uncached.solve(True)
+                self.assertFalse(hasattr(getattr(uncached, cached), "cache_info"))
+                self.assertEqual(val, uncached_val)
+                if self.sequential:
+                    self.assertGreater(getattr(solver, cached).cache_info().hits, 0)
+                    self.assertEqual(stats.nodes, uncached_stats.nodes)
+
+    def test_remaining_items_restored(self):
+        weightclasses, knapsacks, items = random_profit_instance()
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        solver.solve()
+        # every branch is undone and the order by profit per weight is kept
+        self.assertEqual(list(solver._by_ratio), sorted(items, key=lambda x: x.profit / x.weight, reverse=True))
+        self.assertEqual(list(solver._by_weight), sorted(items, key=lambda x: x.weight))
+
+    def test_bounds(self):
+        nodes = {}
+        for bound in ("surrogate", "lagrangian", "adaptive"):
+            weightclasses, knapsacks, items = random_profit_instance()
+            solver = self.class_to_test(weightclasses, knapsacks, items)
+            solver.bound = bound
+            val, _, stats = solver.solve(True)
+            self.assertEqual(val, 258)  # calculated using gurobi
+            nodes[bound] = stats.nodes
+        self.assertLess(nodes["lagrangian"], nodes["surrogate"])
+
+    def test_presolve(self):
+        values = {}
+        for presolve, presolve_interval in ((False, None), (True, None), (True, 2)):
+            weightclasses, knapsacks, items = random_profit_instance()
+            # an item that fits into no knapsack is always removed
+            items.append(weightclasses[0].add_item(set()))
+            solver = self.class_to_test(weightclasses, knapsacks, items)
+            solver.bound = "surrogate"
+            solver.presolve = presolve
+            solver.presolve_interval = presolve_interval
+            values[presolve, presolve_interval], _, stats = solver.solve(True)
+            self.assertEqual(stats.reductions > 0, presolve)
+            # every reduction is undone
+            self.assertEqual(solver._reductions, [])
+            self.assertEqual(len(solver._by_weight), len(items))
+            self.assertTrue(all(knapsack.remaining_capacity == knapsack.capacity for knapsack in knapsacks))
+        self.assertEqual(set(values.values()), {258})  # calculated using gurobi
+
+    def test_cancel(self):
+        weightclasses, knapsacks, items = random_profit_instance()
+        cancel = threading.Event()
+        cancel.set()
+        val, _, stats = self.class_to_test(weightclasses, knapsacks, items).solve(True, cancel=cancel)
+        self.assertEqual(stats.stopped, "cancelled")
+        self.assertEqual(val, -1)
+
+        # the best solution found before the search was cancelled is returned
+        weightclasses, knapsacks, items = random_profit_instance()
+        cancel = threading.Event()
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        solver.bound = "surrogate"
+        val, sol, stats = solver.solve(True, cancel=cancel, on_incumbent=lambda value, solution: cancel.set())
+        self.assertEqual(stats.stopped, "cancelled")
+        self.assertGreater(val, 0)
+        self.assertGreaterEqual(stats.upper_bound, 258)  # calculated using gurobi
+        gurobisol, gurobisolution = validate_solution(knapsacks, items, sol)
+        self.assertEqual(gurobisolution, grb.GRB.Status.OPTIMAL)
+        self.assertEqual(gurobisol, val)
+
+    def test_deadline(self):
+        weightclasses, knapsacks, items = random_profit_instance()
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        _, _, stats = solver.solve(True, deadline=time.monotonic())
+        self.assertEqual(stats.stopped, "deadline")
+
+    def test_signals(self):
+        weightclasses, knapsacks, items = random_profit_instance()
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        solver.bound = "surrogate"
+        val, _, stats = solver.solve(True, handle_signals=True,
+                                     on_incumbent=lambda value, solution: os.kill(os.getpid(), signal.SIGINT))
+        self.assertEqual(stats.stopped, "cancelled")
+        self.assertGreater(val, 0)
+        self.assertIs(signal.getsignal(signal.SIGINT), signal.default_int_handler)
+
+    def test_node_log(self):
+        weightclasses, knapsacks, items = random_profit_instance()
+        solver = self.class_to_test(weightclasses, knapsacks, items)
+        with self.assertLogs("src.MTM_EXTENDED_recursive", "INFO") as logs:
+            val, _ = solver.solve(log_interval=0)
+        self.assertIn(f"incumbent {val}", logs.output[-1])
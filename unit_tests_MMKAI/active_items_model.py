@@ -0,0 +1,82 @@
+# Copyright (c) 2023 Tom Mucke
+import random
+import unittest
+
+from src.models.active_items import ActiveItems
+from src.models.item_class import ItemClass
+from src.models.knapsack import Knapsack
+
+
+class TestActiveItemsModel(unittest.TestCase):
+    def setUp(self):
+        random.seed(2_2360679774)
+        knapsack = Knapsack(100)
+        self.items = [ItemClass(random.randint(1, 5), random.randint(1, 20)).add_item({knapsack}) for _ in range(50)]
+        self.active = ActiveItems(self.items, key=lambda x: x.weight)
+
+    def test_order(self):
+        self.assertEqual(list(self.active), sorted(self.items, key=lambda x: x.weight))
+        self.assertEqual(len(self.active), 50)
+
+    def test_remove_and_add(self):
+        item = self.items[3]
+        self.active.remove(item)
+        self.assertNotIn(item, self.active)
+        self.assertEqual(len(self.active), 49)
+        self.assertNotIn(item, list(self.active))
+        with self.assertRaises(AssertionError):
+            self.active.remove(item)
+        self.active.add(item)
+        self.assertIn(item, self.active)
+        self.assertEqual(list(self.active), sorted(self.items, key=lambda x: x.weight))
+
+    def test_fitting_prefix(self):
+        ordered = sorted(self.items, key=lambda x: x.weight)
+        removed = set()
+        for _ in range(200):
+            item = random.choice(self.items)
+            if item in removed:
+                self.active.add(item)
+                removed.remove(item)
+            else:
+                self.active.remove(item)
+                removed.add(item)
+
+            capacity = random.randint(0, 300)
+            profit = weight = 0
+            position = len(ordered)
+            for i, item in enumerate(ordered):
+                if item in removed:
+                    continue
+                if weight + item.weight > capacity:
+                    position = i
+                    break
+                weight += item.weight
+                profit += item.profit
+            self.assertEqual(self.active.fitting_prefix(capacity), (profit, weight, position))
+
+    def test_bitsets(self):
+        ordered = sorted(self.items, key=lambda x: x.weight)
+        subset = random.sample(self.items, 10)
+        mask = self.active.bitset(subset)
+        self.assertEqual(list(self.active.items_of(mask)), [item for item in ordered if item in subset])
+        self.assertEqual(list(self.active.items_of(0)), [])
+
+        self.active.remove(subset[0])
+        self.assertEqual(list(self.active.items_of(self.active.mask)), list(self.active))
+
+        light = self.active.prefix_mask(10)
+        self.assertEqual(list(self.active.items_of(light)), [item for item in ordered if item.weight <= 10])
+
+    def test_linear_bound(self):
+        by_ratio = ActiveItems(self.items, key=lambda x: x.weight / x.profit)
+        by_ratio.remove(self.items[0])
+        capacity = 100
+        bound = 0
+        for item in sorted(self.items[1:], key=lambda x: x.weight / x.profit):
+            if item.weight > capacity:
+                bound += capacity * item.profit // item.weight
+                break
+            capacity -= item.weight
+            bound += item.profit
+        self.assertEqual(by_ratio.linear_bound(100), bound)
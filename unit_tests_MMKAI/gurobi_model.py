@@ -0,0 +1,79 @@
+# Copyright (c) 2023 Tom Mucke
+import unittest
+
+from src import gurobi
+from src.models.item_class import ItemClass
+from src.models.knapsack import Knapsack
+from src.MTM_EXTENDED_recursive import MTM_EXTENDED_recursive
+from unit_tests_MMKAI.instances import SolutionCheck, by_knapsack, random_instance
+
+
+class TestGurobiModel(SolutionCheck, unittest.TestCase):
+    def setUp(self):
+        self.knapsacks, self.item_classes, self.items = random_instance(2_6457513110, item_count=40,
+                                                                        restrictions=(1, 2))
+
+    def check(self, value, solution):
+        self.check_solution(self.knapsacks, self.items, value, by_knapsack(self.knapsacks, solution))
+
+    @staticmethod
+    def fitting(item):
+        return frozenset(knapsack for knapsack in item.restrictions if knapsack.capacity >= item.weight)
+
+    def test_groups(self):
+        groups, columns = gurobi._groups(self.knapsacks, self.items, True)
+        self.assertLess(len(groups), len(self.items))
+        self.assertEqual(sorted(item.identifier for group in groups for item in group),
+                         sorted(item.identifier for item in self.items))
+        for group in groups:
+            self.assertEqual(len({(item.weight, self.fitting(item)) for item in group}), 1)
+
+        groups, columns = gurobi._groups(self.knapsacks, self.items, False)
+        self.assertEqual(len(groups), len(self.items))
+        self.assertEqual(len(columns), sum(len(self.fitting(item)) for item in self.items))
+
+    def test_aggregate(self):
+        value, solution = gurobi.solve(self.knapsacks, self.items, aggregate=True)
+        self.check(value, solution)
+        binary_value, binary_solution = gurobi.solve(self.knapsacks, self.items, aggregate=False)
+        self.check(binary_value, binary_solution)
+        self.assertEqual(value, binary_value)
+
+    def test_start_in_both_models(self):
+        for aggregate in [True, False]:
+            with self.subTest(aggregate=aggregate):
+                value, solution = gurobi.solve(self.knapsacks, self.items, aggregate=aggregate, start_solution="MMKAI")
+                self.check(value, solution)
+
+    def test_no_fitting_item(self):
+        # every item is heavier than its knapsacks, so the model would have no columns
+        knapsack = Knapsack(4)
+        with self.assertWarns(UserWarning):
+            items = [ItemClass(1, 5).add_item({knapsack}) for _ in range(3)]
+        self.assertEqual(gurobi.solve([knapsack], items), (0, dict()))
+
+    def test_disaggregate(self):
+        items = self.items[:3]
+        groups = [items[:2], items[2:]]
+        columns = [(0, self.knapsacks[0]), (0, self.knapsacks[1]), (1, self.knapsacks[0])]
+        self.assertEqual(gurobi._disaggregate(groups, columns, [1.0, 0.9999, 0.0]),
+                         {items[0]: self.knapsacks[0], items[1]: self.knapsacks[1]})
+
+    def test_start_values(self):
+        items = self.items[:3]
+        groups = [items[:2], items[2:]]
+        columns = [(0, self.knapsacks[0]), (0, self.knapsacks[1]), (1, self.knapsacks[0])]
+        start = {self.knapsacks[0]: [items[0], items[1], self.items[3]], self.knapsacks[1]: []}
+        self.assertEqual(gurobi._start_values(groups, columns, start), [2, 0, 0])
+
+    def test_start_solution(self):
+        value, solution = MTM_EXTENDED_recursive(list(self.item_classes), list(self.knapsacks),
+                                                 list(self.items)).solve()
+        self.assertEqual(gurobi.solve(self.knapsacks, self.items, aggregate=True, start_solution=solution)[0], value)
+        self.assertEqual(gurobi.solve(self.knapsacks, self.items, aggregate=False, start_solution=solution)[0], value)
+
+        items = list(self.items)
+        start_value, start = gurobi.solve(self.knapsacks, self.items, start_solution="MMKAI")
+        self.check(start_value, start)
+        self.assertEqual(start_value, value)
+        self.assertEqual(self.items, items)
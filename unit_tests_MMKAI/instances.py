@@ -0,0 +1,64 @@
+# Copyright (c) 2023 Tom Mucke
+"""
+Random instances and the check of their solutions, shared by the tests of the solver interfaces
+"""
+import random
+
+from src.models.item_class import ItemClass
+from src.models.knapsack import Knapsack
+
+
+def random_instance(seed: int, item_count: int = 30, restrictions: tuple[int, int] = (2, 2)):
+    """
+    Returns 4 knapsacks, 3 item classes with profit 1 and item_count items, every item is restricted to a random number
+    of knapsacks between the bounds of restrictions
+    """
+    random.seed(seed)
+    knapsacks = [Knapsack(random.randint(20, 100)) for _ in range(4)]
+    item_classes = [ItemClass(1, random.randint(5, 40)) for _ in range(3)]
+    items = [random.choice(item_classes).add_item(set(random.sample(knapsacks, random.randint(*restrictions))))
+             for _ in range(item_count)]
+    return knapsacks, item_classes, items
+
+
+def random_profit_instance(seed: int = 1_4142135623):
+    """
+    Returns 5 item classes with different profits, 3 knapsacks and 17 items (in the order of the arguments of the MTM
+    solvers), every item is restricted to 1 to 3 random knapsacks
+    """
+    random.seed(seed)
+    knapsacks = [Knapsack(random.randint(50, 200)) for _ in range(3)]
+    item_classes = [ItemClass(p, w) for p, w in zip(random.sample(range(2, 40), 5), random.sample(range(10, 60), 5))]
+    items = [random.choice(item_classes).add_item(set(random.sample(knapsacks, random.randint(1, 3))))
+             for _ in range(17)]
+    return item_classes, knapsacks, items
+
+
+def by_knapsack(knapsacks, assignment):
+    """
+    Returns the items of every knapsack of a solution given as the knapsack of every item, as returned by gurobi.solve
+    """
+    solution = {knapsack: set() for knapsack in knapsacks}
+    for item, knapsack in assignment.items():
+        solution[knapsack].add(item)
+    return solution
+
+
+class SolutionCheck(object):
+    """
+    Mixin for a TestCase
+    """
+
+    def check_solution(self, knapsacks, items, value, solution):
+        """
+        Checks that solution, the items of every knapsack, is a feasible solution of the instance with the given value
+        """
+        self.assertEqual(set(solution), set(knapsacks))
+        self.assertEqual(value, sum(item.profit for packed in solution.values() for item in packed))
+        self.assertEqual(len({item for packed in solution.values() for item in packed}),
+                         sum(len(packed) for packed in solution.values()))
+        for knapsack, packed in solution.items():
+            self.assertLessEqual(sum(item.weight for item in packed), knapsack.capacity)
+            for item in packed:
+                self.assertIn(item, items)
+                self.assertIn(knapsack, item.restrictions)
@@ -1,8 +1,6 @@
 # Copyright (c) 2023 Tom Mucke
 import unittest
 
-import networkx as nx
-
 from src.models.item import Item
 from src.models.item_class import ItemClass
 from src.models.knapsack import Knapsack
@@ -112,9 +110,9 @@ class TestItemClassModel(unittest.TestCase):
             self.assertEqual(item.weight, corresponding_classes[i].weight)
 
     def test_prepare(self):
-        self.assertEqual(self.item_class_1._graph, None)
-        self.assertEqual(self.item_class_2._graph, None)
-        self.assertEqual(self.item_class_3._graph, None)
+        self.assertEqual(self.item_class_1._types, None)
+        self.assertEqual(self.item_class_2._types, None)
+        self.assertEqual(self.item_class_3._types, None)
         self.assertEqual(self.item_class_1._available_spaces, None)
         self.assertEqual(self.item_class_2._available_spaces, None)
         self.assertEqual(self.item_class_3._available_spaces, None)
@@ -122,33 +120,33 @@ class TestItemClassModel(unittest.TestCase):
         k = [self.knapsack_1, self.knapsack_2]
         self.item_class_1.prepare(k)
         self.assertEqual(k, [self.knapsack_1, self.knapsack_2])
-        self.assertIsInstance(self.item_class_1._graph, nx.Graph)
-        self.assertEqual(self.item_class_1._graph.number_of_nodes(), 0)
         self.assertEqual(self.item_class_1._available_spaces, [0, 0])
+        self.assertEqual(self.item_class_1._types, [])
+        self.assertEqual(self.item_class_1._indptr, [0])
+        self.assertEqual(self.item_class_1._indices, [])
+        self.assertEqual(self.item_class_1._eligible_edges, [[], []])
 
         i_1 = self.item_class_2.add_item({self.knapsack_1})
         i_2 = self.item_class_2.add_item({self.knapsack_2})
+        i_3 = self.item_class_2.add_item({self.knapsack_1, self.knapsack_2})
+        i_4 = self.item_class_2.add_item({self.knapsack_1})
         self.item_class_2.prepare(k)
-        self.assertIsInstance(self.item_class_2._graph, nx.Graph)
-        self.assertEqual(self.item_class_2._available_spaces, [2, 2])
-        self.assertEqual(self.item_class_2._graph.number_of_nodes(), 6)
-        self.assertEqual(self.item_class_2._graph.number_of_edges(), 4)
-        self.assertEqual(len(self.item_class_2._graph[i_1]), 2)
+        self.assertEqual(self.item_class_2._available_spaces, [4, 4])
+        self.assertEqual(self.item_class_2._types, [[i_1, i_4], [i_2], [i_3]])
+        self.assertEqual(self.item_class_2._indptr, [0, 1, 2, 4])
+        self.assertEqual(self.item_class_2._indices, [0, 1, 0, 1])
+        self.assertEqual(self.item_class_2._edge_type, [0, 1, 2, 2])
+        self.assertEqual(self.item_class_2._eligible_edges, [[0, 2], [1, 3]])
 
         items = [self.item_class_3.add_item({self.knapsack_1}) for _ in range(100)]
         self.item_class_3.prepare(k)
-        self.assertIsInstance(self.item_class_3._graph, nx.Graph)
         self.assertEqual(self.item_class_3._available_spaces, [3, 6])
-        self.assertEqual(self.item_class_3._graph.number_of_nodes(), 109)
-        self.assertEqual(self.item_class_3._graph.number_of_edges(), 300)
-        self.assertEqual(len(self.item_class_3._graph[items[0]]), 3)
-        self.assertEqual(len(self.item_class_3._graph[(1, 0)]), 0)
-        self.assertEqual(len(self.item_class_3._graph[(1, 1)]), 0)
-        self.assertEqual(len(self.item_class_3._graph[(1, 2)]), 0)
-
-        self.assertTrue(nx.is_bipartite(self.item_class_1._graph))
-        self.assertTrue(nx.is_bipartite(self.item_class_2._graph))
-        self.assertTrue(nx.is_bipartite(self.item_class_3._graph))
+        # all items fit into the same knapsacks, the graph has a single type
+        self.assertEqual(self.item_class_3._types, [items])
+        self.assertEqual(self.item_class_3._indptr, [0, 1])
+        self.assertEqual(self.item_class_3._indices, [0])
+        self.assertEqual(self.item_class_3._edge_type, [0])
+        self.assertEqual(self.item_class_3._eligible_edges, [[0], []])
 
         self.assertEqual(k, [self.knapsack_1, self.knapsack_2])
 
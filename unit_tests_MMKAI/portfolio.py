@@ -0,0 +1,46 @@
+# Copyright (c) 2023 Tom Mucke
+import unittest
+import warnings
+
+from src.MTM_EXTENDED_recursive import MTM_EXTENDED_recursive
+from src.models.item_class import ItemClass
+from src.portfolio import solve_portfolio
+from unit_tests_MMKAI.instances import SolutionCheck, random_instance
+
+
+class TestPortfolio(SolutionCheck, unittest.TestCase):
+    def setUp(self):
+        self.knapsacks, self.item_classes, self.items = random_instance(3_1415926535)
+        self.value, _ = MTM_EXTENDED_recursive(list(self.item_classes), list(self.knapsacks), list(self.items)).solve()
+
+    def check(self, value, solution):
+        self.check_solution(self.knapsacks, self.items, value, solution)
+
+    def test_portfolio(self):
+        knapsacks = list(self.knapsacks)
+        items = list(self.items)
+        value, solution, name, optimal = solve_portfolio(self.knapsacks, self.items, threads=3, return_solver=True)
+        self.check(value, solution)
+        self.assertEqual(value, self.value)
+        self.assertIn(name, ["MMKAI", "MTM_EXTENDED", "gurobi"])
+        self.assertTrue(optimal)
+        self.assertEqual(self.knapsacks, knapsacks)
+        self.assertEqual(self.items, items)
+
+    def test_solvers(self):
+        for name in ["MMKAI", "MTM_EXTENDED", "gurobi"]:
+            with self.subTest(name=name):
+                value, solution, solver, optimal = solve_portfolio(self.knapsacks, self.items, solvers=[name],
+                                                                   return_solver=True)
+                self.check(value, solution)
+                self.assertEqual(value, self.value)
+                self.assertEqual(solver, name)
+                self.assertTrue(optimal)
+
+    def test_failed_solver(self):
+        self.items.append(ItemClass(2, 10).add_item({self.knapsacks[0]}))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            with self.assertRaises(RuntimeError):
+                solve_portfolio(self.knapsacks, self.items, solvers=["MMKAI"])
+        self.assertTrue(any("MMKAI failed" in str(warning.message) for warning in caught))
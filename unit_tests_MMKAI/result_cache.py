@@ -0,0 +1,119 @@
+# Copyright (c) 2023 Tom Mucke
+import functools
+import random
+import tempfile
+import unittest
+
+from src import gurobi
+from src.MMKAI_recursive import MMKAI_recursive
+from src.MTM_EXTENDED_iterative import MTM_EXTENDED_iterative
+from src.MTM_EXTENDED_parallel import MTM_EXTENDED_parallel
+from src.models.item_class import ItemClass, item_classes_of
+from src.models.knapsack import Knapsack
+from src.result_cache import ResultCache, fingerprint
+from unit_tests_MMKAI.instances import SolutionCheck, by_knapsack, random_instance
+
+
+class TestResultCache(SolutionCheck, unittest.TestCase):
+    @staticmethod
+    def instance(seed=2_7182818284):
+        knapsacks, _, items = random_instance(seed)
+        return knapsacks, items
+
+    def test_fingerprint(self):
+        knapsacks, items = self.instance()
+        key = fingerprint(knapsacks, items)
+        other_knapsacks, other_items = self.instance()
+        random.shuffle(other_knapsacks)
+        random.shuffle(other_items)
+        self.assertEqual(fingerprint(other_knapsacks, other_items), key)
+
+        other_knapsacks, other_items = self.instance()
+        other_items[0].restrictions.add(next(knapsack for knapsack in other_knapsacks
+                                             if knapsack not in other_items[0].restrictions))
+        self.assertNotEqual(fingerprint(other_knapsacks, other_items), key)
+        self.assertNotEqual(fingerprint(*self.instance(1)), key)
+
+    def test_fingerprint_equal_capacities(self):
+        k1, k2, k3 = Knapsack(10), Knapsack(10), Knapsack(30)
+        items = [ItemClass(1, 5).add_item({k1}), ItemClass(1, 5).add_item({k2, k3}),
+                 ItemClass(1, 6).add_item({k2}), ItemClass(1, 6).add_item({k1, k3})]
+        self.assertEqual(fingerprint([k1, k2, k3], items), fingerprint([k2, k1, k3], items))
+
+        random.seed(1_4142135623)
+        knapsacks = [Knapsack(50) for _ in range(5)]
+        item_classes = [ItemClass(random.randint(1, 3), random.randint(5, 40)) for _ in range(4)]
+        items = [random.choice(item_classes).add_item(set(random.sample(knapsacks, 2))) for _ in range(30)]
+        key = fingerprint(knapsacks, items)
+        cache = ResultCache()
+        cache.store(knapsacks, items, *MTM_EXTENDED_iterative(item_classes_of(items), list(knapsacks),
+                                                              list(items)).solve())
+        for _ in range(10):
+            random.shuffle(knapsacks)
+            self.assertEqual(fingerprint(knapsacks, items), key)
+            self.check_solution(knapsacks, items, *cache.get(knapsacks, items))
+
+    def test_solve(self):
+        for solver in [MTM_EXTENDED_iterative, MMKAI_recursive, functools.partial(MTM_EXTENDED_parallel, processes=2)]:
+            with self.subTest(solver=solver):
+                cache = ResultCache()
+                knapsacks, items = self.instance()
+                value, solution = cache.solve(solver, knapsacks, items)
+                self.check_solution(knapsacks, items, value, solution)
+
+                knapsacks, items = self.instance()
+                random.shuffle(items)
+                hits = cache.hits
+                self.assertEqual(cache.solve(solver, knapsacks, items)[0], value)
+                self.check_solution(knapsacks, items, *cache.solve(solver, knapsacks, items))
+                self.assertEqual(cache.hits, hits + 2)
+                self.assertEqual(cache.misses, 1)
+                self.assertEqual(len(cache), 1)
+
+    def test_gurobi(self):
+        cache = ResultCache()
+        knapsacks, items = self.instance()
+        value, assignment = cache.solve(gurobi.solve, knapsacks, items)
+        knapsacks, items = self.instance()
+        cached_value, cached_assignment = cache.solve(gurobi.solve, knapsacks, items)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cached_value, value)
+        self.assertIs(type(cached_value), type(value))
+        self.check_solution(knapsacks, items, cached_value, by_knapsack(knapsacks, cached_assignment))
+
+    def test_not_optimal(self):
+        cache = ResultCache()
+        knapsacks, items = self.instance()
+        cache.solve(MTM_EXTENDED_iterative, knapsacks, items, node_limit=0)
+        self.assertEqual(len(cache), 0)
+
+    def test_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            knapsacks, items = self.instance()
+            value, _ = ResultCache(directory=directory).solve(MTM_EXTENDED_iterative, knapsacks, items)
+            knapsacks, items = self.instance()
+            cache = ResultCache(directory=directory)
+            cached = cache.get(knapsacks, items)
+            self.assertIsNotNone(cached)
+            self.check_solution(knapsacks, items, *cached)
+            self.assertEqual(cached[0], value)
+
+    def test_malformed_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            knapsacks, items = self.instance()
+            cache = ResultCache(directory=directory)
+            path = cache._path(fingerprint(knapsacks, items))
+            for content in ['{"value": 1', '{"value": 1}', '[1, 2]', '1']:
+                with self.subTest(content=content):
+                    with open(path, 'w') as file:
+                        file.write(content)
+                    self.assertIsNone(cache.get(knapsacks, items))
+
+    def test_lru(self):
+        cache = ResultCache(maxsize=2)
+        instances = [self.instance(seed) for seed in range(3)]
+        for knapsacks, items in instances:
+            cache.store(knapsacks, items, 0, {})
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(*instances[0]))
+        self.assertIsNotNone(cache.get(*instances[2]))
@@ -0,0 +1,71 @@
+# Copyright (c) 2023 Tom Mucke
+import itertools
+import random
+import unittest
+
+from src import single_knapsack
+from src.models.item_class import ItemClass
+from src.models.knapsack import Knapsack
+
+
+def brute_force(capacity, items):
+    best = 0
+    for r in range(len(items) + 1):
+        for subset in itertools.combinations(items, r):
+            if sum(item.weight for item in subset) <= capacity:
+                best = max(best, sum(item.profit for item in subset))
+    return best
+
+
+class TestSingleKnapsack(unittest.TestCase):
+    def setUp(self):
+        random.seed(1_7320508075)
+        self.knapsack = Knapsack(1000)
+
+    def random_items(self, n):
+        return [ItemClass(random.randint(1, 50), random.randint(1, 50)).add_item({self.knapsack}) for _ in range(n)]
+
+    def check(self, capacity, items, value, solution):
+        self.assertEqual(value, brute_force(capacity, items))
+        self.assertEqual(value, sum(item.profit for item in solution))
+        self.assertLessEqual(sum(item.weight for item in solution), capacity)
+        self.assertTrue(solution <= set(items))
+
+    def test_empty(self):
+        self.assertEqual(single_knapsack.solve_single_kp(10, []), (0, set()))
+
+    def test_everything_fits(self):
+        items = self.random_items(5)
+        capacity = sum(item.weight for item in items)
+        self.assertEqual(single_knapsack.solve_single_kp(capacity, items),
+                         (sum(item.profit for item in items), set(items)))
+
+    def test_dynamic_programming(self):
+        for _ in range(50):
+            items = self.random_items(random.randint(1, 12))
+            capacity = random.randint(1, 200)
+            self.check(capacity, items, *single_knapsack._dynamic_programming(capacity, items))
+
+    def test_branch_and_bound(self):
+        for _ in range(50):
+            items = self.random_items(random.randint(1, 12))
+            capacity = random.randint(1, 200)
+            fitting = [item for item in items if item.weight <= capacity]
+            if not fitting:
+                continue
+            self.check(capacity, fitting, *single_knapsack._branch_and_bound(capacity, fitting))
+
+    def test_solve(self):
+        for _ in range(50):
+            items = self.random_items(random.randint(1, 12))
+            capacity = random.randint(1, 200)
+            self.check(capacity, items, *single_knapsack.solve_single_kp(capacity, items))
+
+    def test_identical_items(self):
+        # without grouping the branch and bound would try every subset of the interchangeable items
+        items = [ItemClass(3, 7).add_item({self.knapsack}) for _ in range(200)] + \
+                [ItemClass(2, 5).add_item({self.knapsack}) for _ in range(200)]
+        value, solution = single_knapsack._branch_and_bound(999, items)
+        self.assertEqual(value, 428)
+        self.assertEqual(value, sum(item.profit for item in solution))
+        self.assertLessEqual(sum(item.weight for item in solution), 999)
@@ -0,0 +1,38 @@
+# Copyright (c) 2023 Tom Mucke
+import unittest
+
+from src.models.transposition_table import TranspositionTable
+
+
+class TestTranspositionTableModel(unittest.TestCase):
+    def setUp(self):
+        self.table = TranspositionTable(2)
+
+    def test_maxsize(self):
+        self.assertEqual(self.table.maxsize, 2)
+        with self.assertRaises(AssertionError):
+            TranspositionTable(0)
+
+    def test_get(self):
+        self.assertIsNone(self.table.get((0, 1)))
+        self.table.store((0, 1), 5)
+        self.assertEqual(self.table.get((0, 1)), 5)
+        self.assertEqual(len(self.table), 1)
+
+    def test_store_keeps_smaller_bound(self):
+        self.table.store((0, 1), 5)
+        self.table.store((0, 1), 7)
+        self.assertEqual(self.table.get((0, 1)), 5)
+        self.table.store((0, 1), 3)
+        self.assertEqual(self.table.get((0, 1)), 3)
+        self.assertEqual(len(self.table), 1)
+
+    def test_least_recently_used_is_removed(self):
+        self.table.store((0, 1), 5)
+        self.table.store((0, 2), 6)
+        self.table.get((0, 1))
+        self.table.store((0, 3), 7)
+        self.assertEqual(len(self.table), 2)
+        self.assertIn((0, 1), self.table)
+        self.assertNotIn((0, 2), self.table)
+        self.assertIn((0, 3), self.table)